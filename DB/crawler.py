@@ -1,7 +1,18 @@
+import argparse
+import copy
+import csv
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
 import time
 import math  # 페이지 계산용
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 1. 설정
 url = "https://www.hyundai.com/wsvc/kr/front/biz/serviceNetwork.list.do"
@@ -33,118 +44,616 @@ regions = {
     "제주": "제주특별자치도"
 }
 
-all_data = []
+PAGE_SIZE = 10  # 서버가 한 페이지에 내려주는 지점 수
+RETRY_STATUS = {429, 500, 502, 503, 504}  # 잠깐 기다렸다 다시 보내면 되는 응답
+OUTPUT_CSV = "bluehands_final_all.csv"
+STATE_DIR = "crawl_state"  # 체크포인트 + 페이지별 원본 응답 아카이브
 
-print("🔧 전체 데이터 수집 시작")
-   # 도명
-for region_alias, region_full_name in regions.items():
-    print(f"\n🔄 [{region_alias}] 수집 시작")
+# CSV 컬럼 순서 (parse_item이 만드는 dict 키 순서와 같아야 함)
+CSV_FIELDS = [
+    'region', 'name', 'type', 'address', 'phone', 'latitude', 'longitude',
+    'is_ev', 'is_ev_tech', 'is_hydrogen',
+    'is_frame', 'is_al_frame', 'is_n_line',
+    'is_commercial_mid', 'is_commercial_big', 'is_commercial_ev',
+    'is_cs_excellent',
+]
 
-    current_page = 1
-    total_pages = 1  # 일단 1로 시작해서 첫 요청 후 업데이트
 
-    while current_page <= total_pages:
-        # Payload 설정 (pageNo가 계속 변함)
-        payload = {
-            "pageNo": current_page,
-            "searchWord": "",
-            "snGubunListSearch": "",
-            "selectBoxCity": region_full_name,
-            "selectBoxCitySearch": region_full_name,
-            "selectBoxTownShipSearch": "",
-            "asnCd": ""
-        }
+class TokenBucket:
+    # 목적:
+    #  - 모든 워커 스레드가 공유하는 요청 속도 제한기(토큰 버킷).
+    #  - 응답 지연/에러를 관찰해서 속도를 스스로 조절한다(AIMD).
+    #     정상 응답            → rate를 조금씩 올림(최대 max_rate)
+    #     에러 / 지연 급증     → rate를 절반으로 낮춤(최소 min_rate)
+    def __init__(self, rate: float, max_rate: float, min_rate: float = 0.5,
+                 burst: float = 1.0, target_latency: float = 1.0):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.target_latency = target_latency
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
 
+    def acquire(self):
+        # 토큰이 생길 때까지 기다렸다가 1개 소비
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def observe(self, latency: float, ok: bool):
+        with self._lock:
+            if not ok or latency > self.target_latency * 2:
+                self.rate = max(self.min_rate, self.rate / 2)
+            elif latency <= self.target_latency:
+                self.rate = min(self.max_rate, self.rate + 0.5)
+
+
+def build_payload(region_full_name: str, page_no: int) -> dict:
+    # Payload 설정 (pageNo가 계속 변함)
+    return {
+        "pageNo": page_no,
+        "searchWord": "",
+        "snGubunListSearch": "",
+        "selectBoxCity": region_full_name,
+        "selectBoxCitySearch": region_full_name,
+        "selectBoxTownShipSearch": "",
+        "asnCd": ""
+    }
+
+
+class CrawlStats:
+    # 목적:
+    #  - 요청 수 / 재시도 수 / 최종 실패 수 / 요청별 지연시간을 스레드 안전하게 모아서
+    #    실행 끝에 요약으로 보여준다.
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+
+    def retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def fail(self):
+        with self._lock:
+            self.failures += 1
+
+    def summary(self) -> str:
+        if not self.latencies:
+            return "요청 없음"
+        lat = sorted(self.latencies)
+
+        def pct(q):
+            return lat[min(len(lat) - 1, int(q * len(lat)))] * 1000
+
+        return (
+            f"요청 {self.requests}회 / 재시도 {self.retries}회 / 최종 실패 {self.failures}회, "
+            f"지연 p50 {pct(0.50):.0f}ms · p95 {pct(0.95):.0f}ms · 최대 {lat[-1] * 1000:.0f}ms"
+        )
+
+
+class Fetcher:
+    # 목적:
+    #  - keep-alive 세션 1개(커넥션 풀)를 모든 워커가 같이 쓴다.
+    #    → 매 요청마다 TCP/TLS 핸드셰이크를 새로 하지 않음
+    #  - 5xx / 429 / 타임아웃 / 연결 끊김은 지수 백오프로 최대 retries번까지 다시 시도한다.
+    #  - 요청마다 토큰 버킷을 거치고, 지연/에러를 토큰 버킷과 통계에 알려준다.
+    def __init__(self, endpoint: str, limiter: TokenBucket, stats: CrawlStats, pool_size: int,
+                 retries: int = 3, backoff: float = 0.5, timeout: tuple = (5, 20)):
+        self.endpoint = endpoint
+        self.limiter = limiter
+        self.stats = stats
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        # 재시도는 아래 fetch_page에서 직접 처리(통계/토큰 버킷 연동 때문에 urllib3 재시도는 끔)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch_page(self, region_full_name: str, page_no: int):
+        # 목적:
+        #  - 1페이지를 요청해서 (items, totalCount)를 돌려준다.
+        #  - 재시도까지 다 실패하거나 재시도 대상이 아닌 응답이면 RuntimeError로 올려서 호출부가 판단하게 한다.
+        payload = build_payload(region_full_name, page_no)
+
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            started = time.monotonic()
+            retry_after = None
+            try:
+                response = self.session.post(self.endpoint, data=payload, timeout=self.timeout)
+                latency = time.monotonic() - started
+                self.stats.record(latency)
+                ok = response.status_code == 200
+                self.limiter.observe(latency, ok=ok)
+
+                if ok:
+                    result_block = response.json().get('data', {})
+                    return result_block.get('result', []), result_block.get('totalCount', 0)
+
+                error = RuntimeError(f"요청 실패: {response.status_code}")
+                if response.status_code not in RETRY_STATUS:
+                    break
+                retry_after = response.headers.get("Retry-After")
+            except (requests.Timeout, requests.ConnectionError) as e:
+                latency = time.monotonic() - started
+                self.stats.record(latency)
+                self.limiter.observe(latency, ok=False)
+                error = e
+
+            if attempt == self.retries:
+                break
+            self.stats.retry()
+            delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            time.sleep(delay)
+
+        self.stats.fail()
+        raise error
+
+
+def parse_item(item: dict, region_alias: str):
+    # 좌표값 가져오기
+    val1 = float(item.get('mapLaeVal', 0) or 0)
+    val2 = float(item.get('mapLoeVal', 0) or 0)
+
+    # 1. 좌표가 0이면 건너뛰기
+    if val1 == 0 or val2 == 0:
+        print(f"   ⚠️ 좌표 누락된 데이터는 제외: {item.get('asnNm')}")
+        return None
+
+    # 2. 좌표 보정 (경도 127... 위도 37...)
+    if val1 > 100:
+        lon, lat = val1, val2
+    else:
+        lon, lat = val2, val1
+
+    # f12 개발자 도구 까서 확인한 것 !
+    return {
+        # --- 기본 정보 ---
+        'region': region_alias,
+        'name': item.get('asnNm'),
+        'type': item.get('apimCeqPlntNm'),
+        'address': item.get('pbzAdrSbc'),
+        'phone': item.get('repnTn', '').strip(),
+        'latitude': lat,
+        'longitude': lon,
+
+        # 1. 친환경차 관련
+        'is_ev': 1 if item.get('spcialSrvH003', '').strip() == 'Y' else 0,  # 전기차 수리
+        'is_ev_tech': 1 if item.get('spcialSrvC002', '').strip() == 'Y' else 0, # 전동차 기술력 우수
+        'is_hydrogen': 1 if item.get('spcialSrvH001', '').strip() == 'Y' else 0,  # 수소 전기차 수리
+        # 2. 차체/도장 및 특수 수리
+        'is_frame': 1 if item.get('spcialSrvC001', '').strip() == 'Y' else 0,  # 차체/도장 수리 인증
+        'is_al_frame': 1 if item.get('spcialSrvC006', '').strip() == 'Y' else 0,  # 알루미늄 프레임 수리
+        'is_n_line': 1 if item.get('spcialSrvC009', '').strip() == 'Y' else 0,  # 고성능 N 모델 수리
+        # 3. 상용차(트럭/버스) 관련
+        'is_commercial_mid': 1 if item.get('spcialSrvC010', '').strip() == 'Y' else 0,  # 중형 상용 수리
+        'is_commercial_big': 1 if item.get('spcialSrvC011', '').strip() == 'Y' else 0,  # 대형 상용 수리
+        'is_commercial_ev': 1 if item.get('spcialSrvC012', '').strip() == 'Y' else 0,  # 상용 전동차 수리
+        # 4. CS 우수
+        'is_cs_excellent': 1 if item.get('spcialSrvC003', '').strip() == 'Y' else 0,  # CS 우수 업체
+    }
+
+
+class Checkpoint:
+    # 목적:
+    #  - 지역별로 "몇 페이지까지 끝났는지"와 페이지별 내용 해시를 디스크에 기록한다.
+    #  - 끝난 페이지의 원본 응답(items)은 raw/<지역>/<페이지>.json.gz 로 압축 저장한다(아카이브).
+    #    → 중간에 죽어도 --resume 으로 남은 페이지만 이어서 받으면 된다.
+    #    → 파싱 규칙이 바뀌면 --stage parse 로 서버 요청 없이 CSV만 다시 만들 수 있다.
+    #  - 직전 실행의 기록(previous)을 따로 들고 있어서 --incremental 비교에 쓴다.
+    #  - 마지막으로 파싱해서 쓴 출력 파일(parsed)도 기록한다. 그 뒤에 원본이 한 페이지라도 새로 쓰이면 지운다.
+    #    → --incremental 에서 원본이 그대로면 출력 파일을 다시 만들지 않는다(적재 입력이 바이트 단위로 그대로).
+    def __init__(self, state_dir: str):
+        self.state_dir = state_dir
+        self.path = os.path.join(state_dir, "checkpoint.json")
+        self.data = {"regions": {}}
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        self.previous = copy.deepcopy(self.data["regions"])
+
+    def region(self, alias: str) -> dict:
+        return self.data["regions"].get(alias, {})
+
+    def start_region(self, alias: str, total_count: int):
+        # 지역을 처음부터 다시 받는 경우: 진행 기록만 초기화(아카이브 파일은 덮어쓴다)
+        with self._lock:
+            self.data["regions"][alias] = {
+                "total_count": total_count,
+                "total_pages": math.ceil(total_count / PAGE_SIZE),
+                "last_page": 0,
+                "complete": False,
+                "page_hashes": {},
+            }
+            self._save()
+
+    def page_done(self, alias: str, page_no: int, page_hash: str, items: list, write_raw: bool = True):
+        if write_raw:
+            self._write_json(self._raw_path(alias, page_no), items, compress=True)
+
+        with self._lock:
+            if write_raw:
+                self.data.pop("parsed", None)  # 원본이 바뀜 → 마지막 출력 파일은 더 이상 최신이 아님
+            reg = self.data["regions"][alias]
+            reg["page_hashes"][str(page_no)] = page_hash
+            if not items:
+                reg.setdefault("empty_pages", []).append(page_no)
+
+            # 1페이지부터 "빈틈없이" 끝난 페이지까지를 last_page로 본다(동시 요청이라 순서가 섞임)
+            last = reg["last_page"]
+            while str(last + 1) in reg["page_hashes"]:
+                last += 1
+                if last in reg.get("empty_pages", []):  # 빈 페이지 = 그 지역 끝
+                    reg["complete"] = True
+                    break
+            reg["last_page"] = last
+            if last >= reg["total_pages"]:
+                reg["complete"] = True
+            self._save()
+
+    def mark_parsed(self, output: str, fmt: str):
+        with self._lock:
+            self.data["parsed"] = {"output": os.path.abspath(output), "format": fmt}
+            self._save()
+
+    def output_is_current(self, output: str, fmt: str) -> bool:
+        # 마지막 파싱 이후 원본이 한 페이지도 새로 쓰이지 않았고, 같은 경로/형식의 출력 파일이 남아 있는지
+        parsed = self.data.get("parsed")
+        return (parsed == {"output": os.path.abspath(output), "format": fmt}
+                and os.path.exists(output))
+
+    def has_raw(self, alias: str, page_no: int) -> bool:
+        return os.path.exists(self._raw_path(alias, page_no))
+
+    def read_raw(self, alias: str, page_no: int):
+        path = self._raw_path(alias, page_no)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _raw_path(self, alias: str, page_no: int) -> str:
+        return os.path.join(self.state_dir, "raw", alias, f"{page_no:04d}.json.gz")
+
+    def _save(self):
+        self._write_json(self.path, self.data)
+
+    @staticmethod
+    def _write_json(path: str, obj, compress: bool = False):
+        # tmp 파일에 쓰고 교체 → 쓰다가 죽어도 깨진 파일이 남지 않음
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        opener = gzip.open if compress else open
+        with opener(tmp, "wt", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def page_hash(items: list) -> str:
+    return hashlib.sha1(json.dumps(items, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def crawl_page(fetcher: Fetcher, region_alias: str, page_no: int, ck: Checkpoint):
+    # 목적:
+    #  - 1페이지를 받아서 원본 아카이브 저장 → 체크포인트 갱신까지 처리한다(파싱은 parse 단계에서).
+    #  - 직전 실행과 해시가 같은 페이지는 다시 쓰지 않는다(아카이브에 같은 내용이 이미 있음).
+    #  - 반환: 직전 실행과 해시가 같았는지 (incremental 모드의 지역 변경 판단용)
+    items, _ = fetcher.fetch_page(regions[region_alias], page_no)
+    h = page_hash(items)
+
+    prev = ck.previous.get(region_alias, {})
+    unchanged = prev.get("page_hashes", {}).get(str(page_no)) == h
+    ck.page_done(region_alias, page_no, h, items,
+                 write_raw=not (unchanged and ck.has_raw(region_alias, page_no)))
+    return unchanged
+
+
+def probe_region(fetcher: Fetcher, region_alias: str, ck: Checkpoint, incremental: bool):
+    # 목적:
+    #  - 지역의 1페이지를 받아 totalCount를 확인하고, 이어서 받아야 할 페이지 목록을 돌려준다.
+    #  - incremental 모드에서 totalCount와 1페이지 해시가 직전 실행과 같으면 "verify"를 돌려준다.
+    #    1페이지만 같다고 변경 없음으로 볼 수는 없으므로(뒤쪽 페이지의 전화번호/주소만 바뀐 경우 등)
+    #    나머지 페이지도 받아서 페이지별 해시를 모두 비교한다(crawl_all). 같은 페이지는 아카이브를 다시 쓰지 않는다.
+    #  - totalCount나 1페이지 해시가 다르면 바로 "crawled"(변경 있음)
+    items, total_count = fetcher.fetch_page(regions[region_alias], 1)
+    h = page_hash(items)
+
+    prev = ck.previous.get(region_alias, {})
+    same = (incremental and prev.get("complete")
+            and prev.get("total_count") == total_count
+            and prev.get("page_hashes", {}).get("1") == h)
+
+    ck.start_region(region_alias, total_count)
+    ck.page_done(region_alias, 1, h, items, write_raw=not (same and ck.has_raw(region_alias, 1)))
+
+    if not items:  # 데이터가 없으면 중단
+        return ("unchanged" if same else "crawled"), []
+    # 10개씩 보여주니까, 총 페이지 = (전체개수 / 10) 올림 처리
+    return ("verify" if same else "crawled"), list(range(2, math.ceil(total_count / PAGE_SIZE) + 1))
+
+
+def crawl_all(fetcher: Fetcher, concurrency: int, ck: Checkpoint,
+              resume: bool = False, incremental: bool = False) -> dict:
+    # 목적:
+    #  - 지역/페이지 요청을 워커 풀에 동시에 뿌린다. 결과는 체크포인트(원본 아카이브)에 쌓인다.
+    # 흐름:
+    #  1) 지역별 1페이지를 먼저 요청해서 totalCount(=총 페이지 수)를 확인
+    #     (--resume: 중단된 지역은 1페이지 확인 없이 남은 페이지만 바로 요청)
+    #  2) 1페이지가 끝나는 지역부터 나머지 페이지를 바로 풀에 추가
+    #  3) --incremental: totalCount/1페이지가 같았던 지역은 나머지 페이지 해시도 전부 같아야 "변경 없음"
+    # 반환:
+    #  - {"unchanged": [지역...], "failed": {지역: [(페이지, 에러)...]}}
+    unchanged, failed = [], {}
+    verifying = set()  # 1페이지까지 같았던 지역 (다른 페이지가 하나라도 다르거나 실패하면 빠진다)
+    if not resume and not incremental:
+        ck.data["regions"] = {}  # 새로 수집: 직전 기록은 ck.previous(해시 비교용)로만 남긴다
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        first, rest = {}, {}
+
+        for alias in regions:
+            reg = ck.region(alias)
+            if resume and reg.get("page_hashes") and not reg.get("complete"):
+                for page_no in range(1, reg["total_pages"] + 1):
+                    if str(page_no) not in reg["page_hashes"]:
+                        rest[pool.submit(crawl_page, fetcher, alias, page_no, ck)] = (alias, page_no)
+                print(f"   ⏯️ [{alias}] {reg['last_page']}/{reg['total_pages']} 페이지부터 이어서 수집")
+            elif resume and reg.get("complete") and not incremental:
+                print(f"   ⏭️ [{alias}] 이미 완료된 지역 — 건너뜀")
+            else:
+                first[pool.submit(probe_region, fetcher, alias, ck, incremental)] = alias
+
+        for fut in as_completed(first):
+            alias = first[fut]
+            try:
+                status, todo = fut.result()
+            except Exception as e:
+                failed.setdefault(alias, []).append((1, e))
+                continue
+
+            if status == "unchanged":
+                unchanged.append(alias)
+                continue
+            if status == "verify":
+                verifying.add(alias)
+
+            for page_no in todo:
+                rest[pool.submit(crawl_page, fetcher, alias, page_no, ck)] = (alias, page_no)
+
+        for fut in as_completed(rest):
+            alias, page_no = rest[fut]
+            try:
+                if not fut.result():
+                    verifying.discard(alias)  # 해시가 다른 페이지 -> 변경 있음
+            except Exception as e:
+                failed.setdefault(alias, []).append((page_no, e))
+                verifying.discard(alias)
+
+    unchanged.extend(alias for alias in regions if alias in verifying)
+    return {"unchanged": unchanged, "failed": failed}
+
+
+class CsvSink:
+    # 목적:
+    #  - 파싱된 행을 CSV로 흘려 쓴다.
+    # 주의:
+    #  - pandas.to_csv(index=False, encoding="utf-8-sig")와 같은 바이트가 나오도록
+    #    BOM + os.linesep 줄바꿈 + 최소 인용(QUOTE_MINIMAL)으로 맞춘다.
+    def __init__(self, output: str):
+        self._f = open(output, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.DictWriter(self._f, fieldnames=CSV_FIELDS, lineterminator=os.linesep)
+        self._writer.writeheader()
+
+    def write_rows(self, rows: list):
+        self._writer.writerows(rows)
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class ParquetSink:
+    # 목적:
+    #  - 파싱된 행을 Parquet(컬럼형)으로 흘려 쓴다.
+    #  - row group이 너무 잘게 쪼개지지 않도록 row_group_size 행 이상 모였을 때만 flush 한다.
+    #  - 위경도는 float64, 플래그는 uint8로 타입을 고정해서 적재 단계에서 dtype 추론이 필요 없다.
+    # 전제:
+    #  - pyarrow가 설치되어 있어야 한다(pip install pyarrow). CSV만 쓸 때는 필요 없음.
+    def __init__(self, output: str, row_group_size: int = 10000):
         try:
-            response = requests.post(url, data=payload, headers=headers)
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("[ERROR] Parquet 출력에는 pyarrow가 필요합니다: pip install pyarrow")
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [(c, pa.string()) for c in CSV_FIELDS[:5]]
+            + [("latitude", pa.float64()), ("longitude", pa.float64())]
+            + [(c, pa.uint8()) for c in CSV_FIELDS[7:]]
+        )
+        self._writer = pq.ParquetWriter(output, self._schema, compression="zstd")
+        self._row_group_size = row_group_size
+        self._buffer = []
+
+    def write_rows(self, rows: list):
+        self._buffer.extend(rows)
+
+    def flush(self, force: bool = False):
+        if self._buffer and (force or len(self._buffer) >= self._row_group_size):
+            self._writer.write_table(self._pa.Table.from_pylist(self._buffer, schema=self._schema))
+            self._buffer = []
+
+    def close(self):
+        self.flush(force=True)
+        self._writer.close()
+
 
-            if response.status_code == 200:
-                data = response.json()
-                result_block = data.get('data', {})
-                items = result_block.get('result', [])
+def resolve_format(output: str, fmt: str = None) -> str:
+    # fmt이 없으면 확장자로 판단(.parquet → Parquet, 그 외 → CSV)
+    if fmt is None:
+        fmt = "parquet" if output.endswith(".parquet") else "csv"
+    return fmt
 
-                # 첫 페이지일 때만 전체 개수 확인해서 목표 페이지 설정
-                if current_page == 1:
-                    total_count = result_block.get('totalCount', 0)
-                    # 10개씩 보여주니까, 총 페이지 = (전체개수 / 10) 올림 처리
-                    total_pages = math.ceil(total_count / 10)
-                    print(f"   📊 총 {total_count}개 발견 (약 {total_pages} 페이지 예상)")
 
-                if not items:  # 데이터가 없으면 중단
+def open_sink(output: str, fmt: str):
+    return ParquetSink(output) if resolve_format(output, fmt) == "parquet" else CsvSink(output)
+
+
+def parse_archive(ck: Checkpoint, output: str, flush_every: int = 5, fmt: str = None) -> Counter:
+    # 목적:
+    #  - (parse 단계) 원본 아카이브를 원래 순차 크롤링과 "같은 순서/같은 규칙"으로 파싱해서 파일에 바로 흘려 쓴다.
+    #    (지역 순서 → 페이지 순서, 빈 페이지/빠진 페이지를 만나면 그 지역은 거기서 중단)
+    #  - 서버 요청이 전혀 없으므로 파싱 규칙(spcialSrv* 매핑, 위경도 보정)을 바꿔도 로컬 디스크 속도로 다시 만든다.
+    #  - 메모리에는 몇 페이지 분량만 올라온다. flush_every 페이지마다 디스크로 flush.
+    #  - 지역별 개수(기존 df.groupby('region'))도 쓰면서 같이 센다.
+    counts = Counter()
+    pages_written = 0
+
+    sink = open_sink(output, fmt)
+    try:
+        for region_alias in regions:
+            reg = ck.region(region_alias)
+            print(f"\n🔄 [{region_alias}] 저장")
+            if not reg:
+                print("   ⚠️ 수집 기록 없음")
+                continue
+
+            total_pages = reg["total_pages"]
+            print(f"   📊 총 {reg['total_count']}개 발견 (약 {total_pages} 페이지 예상)")
+
+            current_page = 1
+            while current_page <= max(1, total_pages):
+                # 빠진 페이지(실패) / 빈 페이지를 만나면 중단
+                if str(current_page) not in reg["page_hashes"] or current_page in reg.get("empty_pages", []):
                     break
 
-                for item in items:
-                    # 좌표값 가져오기
-                    val1 = float(item.get('mapLaeVal', 0) or 0)
-                    val2 = float(item.get('mapLoeVal', 0) or 0)
-
-                    # 1. 좌표가 0이면 건너뛰기 (continue 필수!)
-                    if val1 == 0 or val2 == 0:
-                        print(f"   ⚠️ 좌표 누락된 데이터는 제외: {item.get('asnNm')}")
-                        continue  # 👈 이게 있어야 밑으로 안 내려가고 다음 루프로 넘어갑니다.
-
-                    # 2. 좌표 보정 (경도 127... 위도 37...)
-                    if val1 > 100:
-                        lon, lat = val1, val2
-                    else:
-                        lon, lat = val2, val1
-
-                    # f12 개발자 도구 까서 확인한 것 !
-                    info = {
-                        # --- 기본 정보 ---
-                        'region': region_alias,
-                        'name': item.get('asnNm'),
-                        'type': item.get('apimCeqPlntNm'),
-                        'address': item.get('pbzAdrSbc'),
-                        'phone': item.get('repnTn', '').strip(),
-                        'latitude': lat,
-                        'longitude': lon,
-
-                        # 1. 친환경차 관련
-                        'is_ev': 1 if item.get('spcialSrvH003', '').strip() == 'Y' else 0,  # 전기차 수리
-                        'is_ev_tech': 1 if item.get('spcialSrvC002', '').strip() == 'Y' else 0, # 전동차 기술력 우수
-                        'is_hydrogen': 1 if item.get('spcialSrvH001', '').strip() == 'Y' else 0,  # 수소 전기차 수리
-                        # 2. 차체/도장 및 특수 수리
-                        'is_frame': 1 if item.get('spcialSrvC001', '').strip() == 'Y' else 0,  # 차체/도장 수리 인증
-                        'is_al_frame': 1 if item.get('spcialSrvC006', '').strip() == 'Y' else 0,  # 알루미늄 프레임 수리
-                        'is_n_line': 1 if item.get('spcialSrvC009', '').strip() == 'Y' else 0,  # 고성능 N 모델 수리
-                        # 3. 상용차(트럭/버스) 관련
-                        'is_commercial_mid': 1 if item.get('spcialSrvC010', '').strip() == 'Y' else 0,  # 중형 상용 수리
-                        'is_commercial_big': 1 if item.get('spcialSrvC011', '').strip() == 'Y' else 0,  # 대형 상용 수리
-                        'is_commercial_ev': 1 if item.get('spcialSrvC012', '').strip() == 'Y' else 0,  # 상용 전동차 수리
-                        # 4. CS 우수
-                        'is_cs_excellent': 1 if item.get('spcialSrvC003', '').strip() == 'Y' else 0,  # CS 우수 업체
-                    }
-                    all_data.append(info)
-
-                # 진행 상황 출력 (너무 자주 찍으면 지저분하니 5페이지마다)
-                if current_page % 5 == 0:
-                    print(f"      ▶ {current_page}/{total_pages} 페이지 수집 중")
+                items = ck.read_raw(region_alias, current_page)
+                if items is None:
+                    print(f"   ⚠️ {current_page}페이지 원본이 아카이브에 없음")
+                    break
+
+                rows = [info for info in (parse_item(item, region_alias) for item in items) if info is not None]
+                sink.write_rows(rows)
+                counts[region_alias] += len(rows)
+
+                pages_written += 1
+                if pages_written % flush_every == 0:
+                    sink.flush()
 
                 current_page += 1  # 다음 페이지로
 
-            else:
-                print(f"      ❌ 요청 실패: {response.status_code}")
-                break
+            state = "완료" if reg.get("complete") else f"미완료 ({reg['last_page']}/{total_pages} 페이지)"
+            print(f"   ✅ [{region_alias}] {counts[region_alias]}개 {state}.")
+    finally:
+        sink.close()
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="현대 블루핸즈 서비스 네트워크 크롤러")
+    parser.add_argument("--stage", choices=["all", "fetch", "parse"], default="all",
+                        help="fetch: 원본만 아카이브에 저장 / parse: 아카이브만으로 CSV 재생성 / all: 둘 다")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 요청하는 워커 수 (1이면 순차)")
+    parser.add_argument("--rate", type=float, default=5.0, help="초당 요청 수 시작값")
+    parser.add_argument("--max-rate", type=float, default=10.0, help="초당 요청 수 상한(지연이 낮으면 여기까지 올림)")
+    parser.add_argument("--retries", type=int, default=3, help="5xx/429/타임아웃 재시도 횟수")
+    parser.add_argument("--backoff", type=float, default=0.5, help="재시도 대기 기본값(초), 시도마다 2배")
+    parser.add_argument("--timeout", type=float, default=20.0, help="응답 대기 시간(초)")
+    parser.add_argument("--url", default=url, help="목록 API 주소 (로컬 mock 서버 테스트용)")
+    parser.add_argument("--output", default=OUTPUT_CSV, help="저장할 파일 경로 (.csv / .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None,
+                        help="출력 형식 (기본: --output 확장자로 판단)")
+    parser.add_argument("--flush-every", type=int, default=5,
+                        help="몇 페이지마다 디스크로 flush 할지 (Parquet은 1만 행 단위 row group)")
+    parser.add_argument("--state-dir", default=STATE_DIR, help="체크포인트/원본 아카이브 저장 폴더")
+    parser.add_argument("--resume", action="store_true", help="중단된 지역을 마지막 완료 페이지 다음부터 이어서 수집")
+    parser.add_argument("--incremental", action="store_true",
+                        help="페이지별 해시로 변경을 감지: 같은 페이지는 원본 아카이브를 다시 쓰지 않고, "
+                             "마지막 저장 이후 원본이 하나도 안 바뀌었으면 출력 파일도 다시 만들지 않음 "
+                             "(요청은 모든 페이지에 대해 보냄)")
+    args = parser.parse_args()
+
+    concurrency = max(1, args.concurrency)
+    limiter = TokenBucket(rate=args.rate, max_rate=max(args.rate, args.max_rate))
+    stats = CrawlStats()
+    fetcher = Fetcher(args.url, limiter, stats, pool_size=concurrency,
+                      retries=args.retries, backoff=args.backoff, timeout=(5, args.timeout))
+    ck = Checkpoint(args.state_dir)
+
+    started = time.monotonic()
+    result = {"unchanged": [], "failed": {}}
+    if args.stage in ("all", "fetch"):
+        print(f"🔧 전체 데이터 수집 시작 (동시 요청 {args.concurrency}개)")
+        result = crawl_all(fetcher, concurrency, ck,
+                           resume=args.resume, incremental=args.incremental)
+        print(f"📦 원본 아카이브: {os.path.join(args.state_dir, 'raw')} ({time.monotonic() - started:.1f}초)")
+
+    # --incremental: 모든 지역이 변경 없음이고 마지막 저장 이후 원본이 한 페이지도 안 바뀌었으면 출력 파일을 그대로 둔다
+    # (--stage parse 는 파싱 규칙을 바꿨을 때 쓰므로 항상 다시 만든다)
+    fmt = resolve_format(args.output, args.format)
+    skip_parse = (args.stage == "all" and args.incremental and not result["failed"]
+                  and set(result["unchanged"]) == set(regions)
+                  and ck.output_is_current(args.output, fmt))
+    if skip_parse:
+        print(f"⏭️ 마지막 저장 이후 원본 변경 없음 — '{args.output}' 파일을 다시 만들지 않았습니다(적재 입력 그대로).")
+
+    if args.stage in ("all", "parse") and not skip_parse:
+        # 결과 저장 (아카이브 → 파싱 → CSV/Parquet으로 바로 흘려 쓰기)
+        parse_started = time.monotonic()
+        counts = parse_archive(ck, args.output, flush_every=max(1, args.flush_every), fmt=fmt)
+        ck.mark_parsed(args.output, fmt)
+        parse_elapsed = time.monotonic() - parse_started
 
-        except Exception as e:
-            print(f"      ⚠️ 에러 발생: {e}")
-            break
+        print("=" * 50)
+        print(f"💾 최종 수집 결과: 총 {sum(counts.values())}개 (파싱 {parse_elapsed:.3f}초)")
+        for region_alias in sorted(counts):  # 지역별 개수 확인
+            print(f"   {region_alias}: {counts[region_alias]}")
+        print(f"\n '{args.output}' 파일로 저장했습니다.")
 
-        time.sleep(0.2)  # 서버 부하 방지
+    if args.stage in ("all", "fetch"):
+        print(f"🌐 {stats.summary()}")
 
-    print(f"   ✅ [{region_alias}] 완료.")
+    if result["unchanged"]:
+        print(f"🔍 변경 없음(모든 페이지 해시 동일, 원본 아카이브 다시 쓰지 않음): {', '.join(result['unchanged'])}")
+    if result["failed"]:
+        for alias, errors in result["failed"].items():
+            pages = ", ".join(str(p) for p, _ in sorted(errors, key=lambda x: x[0]))
+            print(f"⚠️ [{alias}] {pages} 페이지 실패: {errors[0][1]}")
+        print("   → 같은 옵션에 --resume 을 붙여 다시 실행하면 실패한 페이지만 이어서 받습니다.")
 
-# 결과 저장
-print("=" * 50)
-df = pd.DataFrame(all_data)
-print(f"💾 최종 수집 결과: 총 {len(df)}개")
-print(df.groupby('region')['name'].count())  # 지역별 개수 확인
-print(df.head())
 
-# CSV 저장
-df.to_csv("bluehands_final_all.csv", index=False, encoding="utf-8-sig")
-print("\n 'bluehands_final_all.csv' 파일로 저장했습니다.")
+if __name__ == "__main__":
+    main()
 
 
 """
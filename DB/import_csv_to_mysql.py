@@ -1,6 +1,6 @@
 # File: import_csv_to_mysql.py
 # 목적:
-#  - bluehands_final_all.csv 를 읽어서
+#  - bluehands_final_all.csv (또는 크롤러가 쓴 .parquet) 를 읽어서
 #    regions / service_types / bluehands 테이블에 "정규화"된 형태로 적재한다.
 #
 # 전제:
@@ -15,14 +15,28 @@
 import os
 import sys
 import re
+import time
+import argparse
+import hashlib
+import tempfile
+import unicodedata
+import numpy as np
 import pandas as pd
 import pymysql
 from dotenv import load_dotenv  # .env 로드
 
+# 저장소 루트의 Function/ 공용 모듈(geohash 등)을 DB/ 스크립트에서도 쓰기 위해 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Function.geohash import encode_many as geohash_encode_many, GEOHASH_PRECISION
+from Function.address import parse_address_series
+from Function.flags import FLAG_BITS
+
 load_dotenv()
 # ===== 사용자 설정(필요시 수정) =====
 # 하드코딩 대신 환경변수 우선 사용(로컬에서만 설정)
 
+MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
 MYSQL_USER = os.getenv("MYSQL_USER")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")  # 로컬 테스트용. git 커밋 금지.
 MYSQL_DB = os.getenv("MYSQL_DB")
@@ -40,6 +54,9 @@ COL_ADDRESS = "address"
 COL_PHONE = "phone"
 COL_LAT = "latitude"
 COL_LNG = "longitude"
+COL_GEOHASH = "geohash"  # CSV에는 없음. 위경도로 계산해서 넣는 파생 컬럼
+ADDRESS_PART_COLS = ["sido", "gugun", "dong"]  # CSV에는 없음. 주소를 파싱해서 넣는 파생 컬럼
+COL_SERVICE_MASK = "service_mask"  # CSV에는 없음. is_* 플래그를 비트로 묶은 파생 컬럼 (Function/flags.py)
 
 COL_IS_EV = "is_ev"
 COL_IS_EV_TECH = "is_ev_tech"
@@ -52,6 +69,40 @@ COL_IS_COMMERCIAL_BIG = "is_commercial_big"
 COL_IS_COMMERCIAL_EV = "is_commercial_ev"
 COL_IS_CS_EXCELLENT = "is_cs_excellent"
 
+# ===== 데이터 버전 =====
+# meta 테이블에서 앱 캐시 무효화에 쓰는 행 이름 (Function/db.py DATA_VERSION_KEY와 같은 값)
+DATA_VERSION_KEY = "data_version"
+# 새 버전 후보 = 현재 시각(마이크로초). schema.sql을 다시 실행해 meta 행이 새로 생겨도 예전 값보다 커진다.
+NOW_US_SQL = "CAST(UNIX_TIMESTAMP(NOW(6)) * 1000000 AS UNSIGNED)"
+
+# ===== 적재 방식 =====
+LOAD_METHODS = ["infile", "values", "executemany"]
+DEFAULT_BATCH_SIZE = 1000
+
+# 서버/클라이언트가 LOCAL INFILE을 허용하지 않을 때 나오는 에러 코드
+#  - 1148: The used command is not allowed with this MySQL version
+#  - 3948: Loading local data is disabled
+#  - 2068: LOAD DATA LOCAL INFILE file request rejected
+INFILE_DISABLED_ERRNOS = {1148, 3948, 2068}
+
+STR_COLS = [COL_REGION, COL_NAME, COL_TYPE, COL_ADDRESS]
+FLAG_COLS = [
+    COL_IS_EV, COL_IS_EV_TECH, COL_IS_HYDROGEN,
+    COL_IS_FRAME, COL_IS_AL_FRAME, COL_IS_N_LINE,
+    COL_IS_COMMERCIAL_MID, COL_IS_COMMERCIAL_BIG, COL_IS_COMMERCIAL_EV,
+    COL_IS_CS_EXCELLENT,
+]
+
+# bluehands INSERT 컬럼 순서 (build_bluehands_rows가 만드는 튜플 순서와 같다)
+# 지점 자연키: sha1(지점명 + 정규화 주소). DB의 UNIQUE KEY(uk_bluehands_branch_key)와 같은 값
+COL_BRANCH_KEY = "branch_key"
+
+INSERT_COLUMNS = [
+    COL_BRANCH_KEY,
+    "name", "region_id", "type_id",
+    "address", "phone", "latitude", "longitude", COL_GEOHASH,
+] + ADDRESS_PART_COLS + FLAG_COLS + [COL_SERVICE_MASK]
+
 
 def die(msg: str) -> None:
     # 목적:
@@ -72,6 +123,7 @@ def connect_mysql():
         database=MYSQL_DB,
         charset="utf8mb4",
         autocommit=False,
+        local_infile=True,  # LOAD DATA LOCAL INFILE 경로용 (서버에서 막혀 있으면 VALUES 배치로 대체)
         cursorclass=pymysql.cursors.DictCursor,
     )
 
@@ -126,6 +178,129 @@ def format_phone_kor(x):
     return digits
 
 
+def normalize_str_series(s: pd.Series) -> pd.Series:
+    # 목적:
+    #  - normalize_str를 컬럼 단위로 한 번에 처리한다(행마다 파이썬 함수 호출 X).
+    #  - None/NaN/빈문자열 -> None, 문자열은 좌우 공백 제거.
+    out = s.astype("string").str.strip()
+    out = out.mask(out == "")
+    return out.astype(object).where(out.notna(), None)
+
+
+# 전화번호 자릿수 규칙 -> (정규식, 치환) : format_phone_kor와 같은 규칙
+_PHONE_3_4_4 = (r"^(\d{3})(\d{4})(\d{4})$", r"\1-\2-\3")
+_PHONE_2_3_4 = (r"^(\d{2})(\d{3})(\d{4})$", r"\1-\2-\3")
+_PHONE_2_4_4 = (r"^(\d{2})(\d{4})(\d{4})$", r"\1-\2-\3")
+_PHONE_3_3_4 = (r"^(\d{3})(\d{3})(\d{4})$", r"\1-\2-\3")
+
+
+def format_phone_series(s: pd.Series) -> pd.Series:
+    # 목적:
+    #  - format_phone_kor를 컬럼 단위(정규식 벡터 연산)로 처리한다.
+    #  - 자릿수/앞자리로 마스크를 만든 뒤, 마스크별로 한 번씩만 정규식 치환한다.
+    digits = normalize_str_series(s).astype("string").str.replace(r"[^0-9]", "", regex=True)
+    n = digits.str.len()
+    seoul = digits.str.startswith("02")
+
+    out = digits.copy()
+    for mask, (pattern, repl) in (
+        (n == 11, _PHONE_3_4_4),                  # 010 휴대폰 + 그 외 11자리
+        (seoul & (n == 9), _PHONE_2_3_4),         # 서울 02 (9자리)
+        (seoul & (n == 10), _PHONE_2_4_4),        # 서울 02 (10자리)
+        (~seoul & (n == 10), _PHONE_3_3_4),       # 그 외 지역번호 10자리
+    ):
+        mask = mask.fillna(False).astype(bool)
+        out[mask] = digits[mask].str.replace(pattern, repl, regex=True)
+
+    out = out.mask(out == "")
+    return out.astype(object).where(out.notna(), None)
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # 목적:
+    #  - 문자열 정리 / 전화번호 포맷 / 위경도 float / 플래그 0·1 정수화를 컬럼 단위로 끝낸다.
+    #  - 필수값(region/name/type)이 비어있는 행은 제거한다.
+    #  - 위경도가 없거나 범위를 벗어난 행도 제거한다.
+    #    (bluehands.location = ST_SRID(POINT(경도, 위도), 4326) 가 NOT NULL + SPATIAL INDEX 라서
+    #     좌표 없는 행은 적재 자체가 실패한다)
+    df = df.copy()
+    for col in STR_COLS:
+        df[col] = normalize_str_series(df[col])
+
+    # phone은 하이픈 포맷까지 적용(문자열로 저장)
+    df[COL_PHONE] = format_phone_series(df[COL_PHONE])
+
+    df[COL_LAT] = pd.to_numeric(df[COL_LAT], errors="coerce").astype("float64")
+    df[COL_LNG] = pd.to_numeric(df[COL_LNG], errors="coerce").astype("float64")
+
+    # 플래그: NaN/이상값 -> 0, 나머지는 정수
+    df[FLAG_COLS] = (
+        df[FLAG_COLS].apply(pd.to_numeric, errors="coerce").fillna(0).astype(np.int64)
+    )
+
+    df = df.dropna(subset=[COL_REGION, COL_NAME, COL_TYPE])
+    df = df[df[COL_LAT].between(-90, 90) & df[COL_LNG].between(-180, 180)]
+
+    # 자연키 계산 + 같은 지점이 두 번 나오면 첫 행만 사용(UNIQUE KEY 충돌 방지)
+    df[COL_BRANCH_KEY] = branch_key_series(df)
+    return df.drop_duplicates(subset=[COL_BRANCH_KEY], keep="first")
+
+
+def normalize_address_series(s: pd.Series) -> pd.Series:
+    # 목적:
+    #  - 자연키 비교용 주소 정규화: 유니코드 NFC + 연속 공백 1칸 + 좌우 공백 제거.
+    #  - 크롤링 때마다 공백이 조금씩 달라도 같은 지점으로 본다.
+    out = s.fillna("").astype(str).map(lambda x: unicodedata.normalize("NFC", x))
+    return out.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def branch_key_series(df: pd.DataFrame) -> pd.Series:
+    # 목적:
+    #  - 지점 자연키 = sha1("지점명\x1f정규화주소") (40자 hex)
+    names = df[COL_NAME].fillna("").astype(str).map(lambda x: unicodedata.normalize("NFC", x).strip())
+    addrs = normalize_address_series(df[COL_ADDRESS])
+    keys = [
+        hashlib.sha1(f"{n}\x1f{a}".encode("utf-8")).hexdigest()
+        for n, a in zip(names, addrs)
+    ]
+    return pd.Series(keys, index=df.index, dtype=object)
+
+
+def build_bluehands_rows(df: pd.DataFrame, region_map: dict, type_map: dict) -> list[tuple]:
+    # 목적:
+    #  - 정리된 DataFrame을 insert_bluehands에 바로 넘길 튜플 리스트로 만든다.
+    #  - region/type 이름 -> id 는 map으로 한 번에 변환, 매핑 안 되는 행은 제외.
+    #  - pymysql이 numpy 타입을 못 다루므로 object 변환으로 파이썬 int/float/None만 남긴다.
+    region_id = df[COL_REGION].map(region_map)
+    type_id = df[COL_TYPE].map(type_map)
+    keep = region_id.notna() & type_id.notna()
+
+    out = pd.DataFrame({
+        COL_BRANCH_KEY: df[COL_BRANCH_KEY],
+        "name": df[COL_NAME],
+        "region_id": region_id,
+        "type_id": type_id,
+        "address": df[COL_ADDRESS],
+        "phone": df[COL_PHONE],
+        "latitude": df[COL_LAT],
+        "longitude": df[COL_LNG],
+        # 반경 검색용 셀 id (bluehands.idx_bluehands_geohash). clean_frame에서 좌표 없는 행은 이미 제거됨
+        COL_GEOHASH: geohash_encode_many(df[COL_LAT], df[COL_LNG], GEOHASH_PRECISION),
+    }, index=df.index)[keep]
+    # 시/도 · 구/군 · 동 (selectbox/Filtering의 지역 드롭다운이 인덱스로 조회하는 컬럼)
+    out[ADDRESS_PART_COLS] = parse_address_series(df.loc[keep, COL_ADDRESS])
+    out["region_id"] = out["region_id"].astype(np.int64)
+    out["type_id"] = out["type_id"].astype(np.int64)
+    for col in FLAG_COLS:
+        out[col] = df.loc[keep, col]
+    # 플래그 10개 -> 비트마스크 1개 (앱 필터는 (service_mask & m) = m 한 번으로 끝남)
+    out[COL_SERVICE_MASK] = sum(out[col] * FLAG_BITS[col] for col in FLAG_COLS)
+
+    out = out[INSERT_COLUMNS].astype(object)
+    out = out.where(out.notna(), None)
+    return list(out.itertuples(index=False, name=None))
+
+
 def ensure_required_columns(df: pd.DataFrame):
     # 목적:
     #  - CSV 헤더가 우리가 기대하는 컬럼을 모두 갖고 있는지 검증한다.
@@ -167,130 +342,383 @@ def load_name_to_id(cur, table_name: str) -> dict:
     return {r["name"]: r["id"] for r in rows}
 
 
-def insert_bluehands(cur, rows: list[dict]):
+def ensure_dim_ids(cur, table_name: str, values, name_to_id: dict) -> dict:
+    # 목적:
+    #  - 청크에 처음 나온 차원 값만 INSERT IGNORE 하고, 그때만 name -> id 매핑을 다시 읽는다.
+    #  - 이미 아는 값뿐이면 DB를 건드리지 않고 캐시(name_to_id)를 그대로 돌려준다.
+    missing = sorted(v for v in values if v is not None and v not in name_to_id)
+    if not missing:
+        return name_to_id
+    insert_dim_table(cur, table_name, missing)
+    return load_name_to_id(cur, table_name)
+
+
+def insert_bluehands(cur, rows: list[tuple]):
     # 목적:
     #  - bluehands 테이블에 데이터를 bulk insert 한다.
     # 전제:
+    #  - rows는 build_bluehands_rows가 만든 INSERT_COLUMNS 순서의 튜플이다.
     #  - DB 스키마는 최신 컬럼을 모두 가지고 있다고 가정한다(동적 컬럼 감지 제거).
-    sql = """
-    INSERT INTO bluehands (
-        name, region_id, type_id,
-        address, phone, latitude, longitude,
-        is_ev, is_ev_tech, is_hydrogen,
-        is_frame, is_al_frame, is_n_line,
-        is_commercial_mid, is_commercial_big, is_commercial_ev,
-        is_cs_excellent
-    ) VALUES (
-        %s, %s, %s,
-        %s, %s, %s, %s,
-        %s, %s, %s,
-        %s, %s, %s,
-        %s, %s, %s,
-        %s
-    )
-    """
-
-    data = []
-    for r in rows:
-        data.append((
-            r["name"], r["region_id"], r["type_id"],
-            r["address"], r["phone"], r["latitude"], r["longitude"],
-            r["is_ev"], r["is_ev_tech"], r["is_hydrogen"],
-            r["is_frame"], r["is_al_frame"], r["is_n_line"],
-            r["is_commercial_mid"], r["is_commercial_big"], r["is_commercial_ev"],
-            r["is_cs_excellent"],
-        ))
+    cols_sql = ", ".join(INSERT_COLUMNS)
+    placeholders = ", ".join(["%s"] * len(INSERT_COLUMNS))
+    sql = f"INSERT INTO bluehands ({cols_sql}) VALUES ({placeholders})"
+
+    if rows:
+        cur.executemany(sql, rows)
 
-    if data:
-        cur.executemany(sql, data)
 
+def insert_bluehands_values(cur, rows: list[tuple], batch_size: int = DEFAULT_BATCH_SIZE):
+    # 목적:
+    #  - INSERT ... VALUES (...), (...), ... 형태로 batch_size 행씩 묶어서 보낸다.
+    #  - 왕복 횟수 = 행 수 / batch_size
+    cols_sql = ", ".join(INSERT_COLUMNS)
+    row_sql = "(" + ", ".join(["%s"] * len(INSERT_COLUMNS)) + ")"
 
-def main():
-    # 0) CSV 파일 존재 확인
-    if not os.path.exists(CSV_PATH):
-        die(f"CSV 파일을 찾을 수 없습니다: {CSV_PATH}")
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        sql = f"INSERT INTO bluehands ({cols_sql}) VALUES " + ", ".join([row_sql] * len(batch))
+        cur.execute(sql, [v for row in batch for v in row])
 
-    # 1) CSV 로드 + 헤더 검증
-    df = pd.read_csv(CSV_PATH, encoding="utf-8")
-    ensure_required_columns(df)
 
-    # 2) 문자열 컬럼 정리(공백/빈값/NaN -> None)
-    df[COL_REGION] = df[COL_REGION].apply(normalize_str)
-    df[COL_NAME] = df[COL_NAME].apply(normalize_str)
-    df[COL_TYPE] = df[COL_TYPE].apply(normalize_str)
-    df[COL_ADDRESS] = df[COL_ADDRESS].apply(normalize_str)
+def _tsv_field(v) -> str:
+    # LOAD DATA 기본 규칙: NULL은 \N, 역슬래시/탭/줄바꿈은 역슬래시로 이스케이프
+    if v is None:
+        return "\\N"
+    if isinstance(v, float):
+        return repr(v)
+    s = str(v)
+    return s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
 
-    # phone은 하이픈 포맷까지 적용(문자열로 저장)
-    df[COL_PHONE] = df[COL_PHONE].apply(format_phone_kor)
 
-    # 3) 필수값이 비어있는 행 제거(최소한 region/name/type는 있어야 함)
-    df = df.dropna(subset=[COL_REGION, COL_NAME, COL_TYPE])
+def write_tsv(rows: list[tuple], path: str):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for row in rows:
+            f.write("\t".join(_tsv_field(v) for v in row))
+            f.write("\n")
+
+
+def load_bluehands_infile(cur, rows: list[tuple]):
+    # 목적:
+    #  - 정리된 행들을 임시 TSV로 쓰고 LOAD DATA LOCAL INFILE 한 번으로 적재한다.
+    #  - 서버가 파일을 통째로 파싱하므로 행 단위 파라미터 바인딩 비용이 없다.
+    if not rows:
+        return
+
+    fd, path = tempfile.mkstemp(suffix=".tsv", prefix="bluehands_")
+    os.close(fd)
+    try:
+        write_tsv(rows, path)
+        cols_sql = ", ".join(INSERT_COLUMNS)
+        cur.execute(
+            "LOAD DATA LOCAL INFILE %s INTO TABLE bluehands "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            "LINES TERMINATED BY '\\n' "
+            f"({cols_sql})",
+            (path,),
+        )
+    finally:
+        os.remove(path)
+
+
+def bulk_insert(cur, rows: list[tuple], method: str = "infile", batch_size: int = DEFAULT_BATCH_SIZE) -> str:
+    # 목적:
+    #  - 적재 방식을 골라 bluehands에 넣는다. 실제로 사용된 방식을 돌려준다.
+    #  - infile이 서버 설정(local_infile=OFF 등)으로 막혀 있으면 VALUES 배치로 자동 대체한다.
+    if method == "infile":
+        try:
+            load_bluehands_infile(cur, rows)
+            return "infile"
+        except (pymysql.err.OperationalError, pymysql.err.InternalError) as e:
+            if e.args and e.args[0] in INFILE_DISABLED_ERRNOS:
+                print(f"[WARN] LOAD DATA LOCAL INFILE 사용 불가({e.args[0]}) -> VALUES 배치로 대체")
+                method = "values"
+            else:
+                raise
+
+    if method == "values":
+        insert_bluehands_values(cur, rows, batch_size=batch_size)
+        return "values"
+
+    insert_bluehands(cur, rows)
+    return "executemany"
+
+
+def compare_load_methods(conn, rows: list[tuple], batch_size: int):
+    # 목적:
+    #  - 같은 행들을 방식별로 적재해 보고 걸린 시간을 비교한다.
+    #  - 방식마다 SAVEPOINT로 되돌리고, 끝나면 전체 rollback 하므로 테이블에는 아무것도 남지 않는다.
+    #    (호출 전에 같은 트랜잭션에서 채운 regions / service_types 도 함께 rollback 된다)
+    #  - branch_key UNIQUE 충돌이 없도록 트랜잭션 안에서 기존 행을 먼저 비운다(시간 측정 제외).
+    print(f"[BENCH] {len(rows)} rows, batch_size={batch_size}")
+    try:
+        for method in LOAD_METHODS:
+            with conn.cursor() as cur:
+                cur.execute("SAVEPOINT bench")
+                cur.execute("DELETE FROM bluehands")
+                started = time.perf_counter()
+                try:
+                    used = bulk_insert(cur, rows, method=method, batch_size=batch_size)
+                    elapsed = time.perf_counter() - started
+                    label = method if used == method else f"{method} -> {used}"
+                    print(f"  {label:<22} {elapsed:8.3f}s  ({len(rows) / max(elapsed, 1e-9):,.0f} rows/s)")
+                except Exception as e:
+                    print(f"  {method:<22} 실패: {e}")
+                finally:
+                    cur.execute("ROLLBACK TO SAVEPOINT bench")
+    finally:
+        conn.rollback()
+
 
-    # 4) 차원 테이블 값 추출(중복 제거)
-    regions = sorted(df[COL_REGION].dropna().unique().tolist())
-    types = sorted(df[COL_TYPE].dropna().unique().tolist())
+def _same(a: pd.Series, b: pd.Series) -> pd.Series:
+    # NULL끼리는 같은 값으로 본다
+    return (a == b) | (a.isna() & b.isna())
+
+
+def load_existing_rows(cur, keys: list[str], batch_size: int = DEFAULT_BATCH_SIZE) -> pd.DataFrame:
+    # 목적:
+    #  - 주어진 자연키에 해당하는 현재 bluehands 행만 읽는다(테이블 전체 X).
+    #  - branch_key는 UNIQUE 인덱스라 IN 조회가 인덱스로 끝난다.
+    found = []
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        cur.execute(
+            f"SELECT id, {', '.join(INSERT_COLUMNS)} FROM bluehands "
+            f"WHERE {COL_BRANCH_KEY} IN ({', '.join(['%s'] * len(batch))})",
+            batch,
+        )
+        found.extend(cur.fetchall())
+    return pd.DataFrame(found, columns=["id"] + INSERT_COLUMNS)
+
+
+def sync_bluehands(cur, rows: list[tuple], method: str = "infile",
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    # 목적:
+    #  - 현재 bluehands 테이블과 새 데이터(rows, 청크 1개 분량)를 자연키(branch_key)로 비교해서
+    #    필요한 INSERT / UPDATE만 보낸다(전체 재적재 X).
+    #  - 새 데이터에 없는 지점의 DELETE는 모든 청크를 본 뒤 delete_missing_branches에서 한 번에 한다.
+    # 반환:
+    #  - {"added": n, "changed": n, "unchanged": n}
+    value_cols = [c for c in INSERT_COLUMNS if c != COL_BRANCH_KEY]
+    key_pos = INSERT_COLUMNS.index(COL_BRANCH_KEY)
+    by_key = {r[key_pos]: r for r in rows}
+
+    new = pd.DataFrame(rows, columns=INSERT_COLUMNS)
+    old = load_existing_rows(cur, list(by_key), batch_size=batch_size)
+
+    merged = new.merge(old, on=COL_BRANCH_KEY, how="left", suffixes=("", "_old"), indicator=True)
+    added = merged[merged["_merge"] == "left_only"]
+    both = merged[merged["_merge"] == "both"]
+
+    same = pd.Series(True, index=both.index)
+    for col in value_cols:
+        same &= _same(both[col], both[f"{col}_old"])
+    changed = both[~same]
+
+    # 1) UPDATE: 자연키는 같고 값이 바뀐 지점 (id 유지)
+    #    값은 merge 결과(join으로 int가 float이 될 수 있음)가 아니라 원래 rows 튜플에서 꺼낸다.
+    if len(changed):
+        set_sql = ", ".join(f"{c} = %s" for c in value_cols)
+        params = [
+            tuple(v for c, v in zip(INSERT_COLUMNS, by_key[k]) if c != COL_BRANCH_KEY) + (int(i),)
+            for k, i in zip(changed[COL_BRANCH_KEY], changed["id"])
+        ]
+        cur.executemany(f"UPDATE bluehands SET {set_sql} WHERE id = %s", params)
+
+    # 2) INSERT: 새로 생긴 지점
+    if len(added):
+        bulk_insert(cur, [by_key[k] for k in added[COL_BRANCH_KEY]], method=method, batch_size=batch_size)
+
+    return {
+        "added": len(added),
+        "changed": len(changed),
+        "unchanged": len(both) - len(changed),
+    }
+
+
+def delete_missing_branches(cur, seen_keys: set, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    # 목적:
+    #  - 이번 CSV에 한 번도 나오지 않은 지점(폐점 등)을 지운다.
+    #  - id/branch_key 두 컬럼만 읽으므로 테이블이 커도 가볍다.
+    cur.execute(f"SELECT id, {COL_BRANCH_KEY} FROM bluehands")
+    removed_ids = [int(r["id"]) for r in cur.fetchall() if r[COL_BRANCH_KEY] not in seen_keys]
+
+    for start in range(0, len(removed_ids), batch_size):
+        batch = removed_ids[start:start + batch_size]
+        cur.execute(
+            f"DELETE FROM bluehands WHERE id IN ({', '.join(['%s'] * len(batch))})",
+            batch,
+        )
+    return len(removed_ids)
+
+
+def bump_data_version(cur) -> int:
+    # 목적:
+    #  - meta.data_version을 max(이전 값 + 1, 현재 시각(마이크로초))로 올리고 새 값을 돌려준다.
+    #    (행이 없으면 현재 시각으로 만든다) -> 전에 쓰인 어떤 값보다도 커서 예전 캐시 키가 다시 쓰이지 않는다.
+    #  - 적재와 같은 트랜잭션 안에서 불러야, 앱이 새 버전을 볼 때 새 데이터도 같이 보인다.
+    cur.execute(
+        f"INSERT INTO meta (name, value) VALUES (%s, {NOW_US_SQL}) "
+        f"ON DUPLICATE KEY UPDATE value = GREATEST(value + 1, {NOW_US_SQL})",
+        (DATA_VERSION_KEY,),
+    )
+    cur.execute("SELECT value FROM meta WHERE name = %s", (DATA_VERSION_KEY,))
+    row = cur.fetchone()
+    return int(row["value"] if isinstance(row, dict) else row[0])
+
+
+def iter_input_chunks(path: str, chunksize: int):
+    # 목적:
+    #  - chunksize > 0 이면 입력을 chunksize 행씩 나눠 읽는다(메모리 사용량이 파일 크기와 무관).
+    #  - 0이면 기존처럼 파일 전체를 한 번에 읽는다(청크 1개).
+    #  - .parquet: 크롤러가 쓴 타입(float64 위경도, uint8 플래그, 문자열 phone) 그대로 읽는다.
+    #  - 그 외(CSV): phone은 숫자로 추론되면 앞자리 0이 사라지므로 문자열로 읽는다.
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            die("Parquet 입력에는 pyarrow가 필요합니다: pip install pyarrow")
+
+        pf = pq.ParquetFile(path)
+        if chunksize and chunksize > 0:
+            for batch in pf.iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+        else:
+            yield pf.read().to_pandas()
+        return
+
+    if chunksize and chunksize > 0:
+        yield from pd.read_csv(path, encoding="utf-8", dtype={COL_PHONE: str}, chunksize=chunksize)
+    else:
+        yield pd.read_csv(path, encoding="utf-8", dtype={COL_PHONE: str})
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="bluehands CSV -> MySQL 적재")
+    parser.add_argument("--input", "--csv", dest="input", default=CSV_PATH,
+                        help="읽을 CSV/Parquet 경로 (기본: CSV_PATH 환경변수, .parquet이면 Parquet으로 읽음)")
+    parser.add_argument("--mode", choices=["sync", "insert"], default="sync",
+                        help="sync: 자연키 비교 후 바뀐 행만 INSERT/UPDATE/DELETE / insert: 전부 INSERT(빈 테이블용)")
+    parser.add_argument("--load", choices=LOAD_METHODS, default="infile",
+                        help="infile: LOAD DATA LOCAL INFILE / values: 다중행 VALUES 배치 / executemany: 기존 방식")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="VALUES 배치당 행 수")
+    parser.add_argument("--chunksize", type=int, default=50000,
+                        help="입력을 몇 행씩 나눠 읽을지 (0이면 파일 전체를 한 번에)")
+    parser.add_argument("--commit-every", type=int, default=10,
+                        help="몇 청크마다 commit 할지 (0이면 마지막에 한 번만 commit, 바뀐 행이 있으면 commit마다 data_version을 올림)")
+    parser.add_argument("--compare", action="store_true",
+                        help="적재 방식별 소요 시간만 비교하고 rollback (데이터 변경 없음)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    input_path = args.input
+
+    # 0) 입력 파일 존재 확인
+    if not os.path.exists(input_path):
+        die(f"입력 파일을 찾을 수 없습니다: {input_path}")
+
+    totals = {"read": 0, "cleaned": 0, "mapped": 0, "added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+    seen_regions, seen_types = set(), set()
+    seen_keys = set()  # 자연키(40자)만 보관: 청크 간 중복 제거 + sync 마지막 DELETE 판단용
+    compare_rows = []
+    used = args.load
+    data_version = None
+    uncommitted_changes = 0  # 마지막 버전 올림 이후 바뀐 행 수 (commit 할 때 버전도 같이 올릴지 판단)
 
     conn = connect_mysql()
     try:
         with conn.cursor() as cur:
-            # 5) regions / service_types 채우기
-            insert_dim_table(cur, "regions", regions)
-            insert_dim_table(cur, "service_types", types)
-
-            # 6) name -> id 매핑 로드
+            # name -> id 매핑은 한 번 읽어서 캐시, 새 값이 나온 청크에서만 다시 읽는다
             region_map = load_name_to_id(cur, "regions")
             type_map = load_name_to_id(cur, "service_types")
 
-            # 7) bluehands rows 구성
-            #    - 위경도/플래그는 CSV에서 이미 전처리 완료라고 가정.
-            #    - 다만 pandas에서 NaN으로 들어올 수 있으니 NaN -> None/0 정도만 최소 방어.
-            out_rows = []
-            for _, row in df.iterrows():
-                region_id = region_map.get(row[COL_REGION])
-                type_id = type_map.get(row[COL_TYPE])
-                if region_id is None or type_id is None:
+            started = time.perf_counter()
+            for n, chunk in enumerate(iter_input_chunks(input_path, args.chunksize), 1):
+                # 1) 헤더 검증(첫 청크에서 한 번)
+                if n == 1:
+                    ensure_required_columns(chunk)
+                totals["read"] += len(chunk)
+
+                # 2) 문자열/전화번호/위경도/플래그 정리 + 필수값(region/name/type/좌표) 없는 행 제거
+                #    앞 청크에서 이미 나온 지점(자연키)은 제외
+                chunk = clean_frame(chunk)
+                chunk = chunk[~chunk[COL_BRANCH_KEY].isin(seen_keys)]
+                totals["cleaned"] += len(chunk)
+
+                # 3) regions / service_types: 이 청크에서 처음 보는 값만 채우기
+                regions = chunk[COL_REGION].dropna().unique().tolist()
+                types = chunk[COL_TYPE].dropna().unique().tolist()
+                seen_regions.update(regions)
+                seen_types.update(types)
+                region_map = ensure_dim_ids(cur, "regions", regions, region_map)
+                type_map = ensure_dim_ids(cur, "service_types", types, type_map)
+
+                # 4) bluehands rows 구성 (id 매핑 + 튜플 변환을 컬럼 단위로)
+                out_rows = build_bluehands_rows(chunk, region_map, type_map)
+                seen_keys.update(chunk[COL_BRANCH_KEY])
+                totals["mapped"] += len(out_rows)
+
+                if args.compare:
+                    compare_rows.extend(out_rows)  # 비교는 전체 행으로 해야 의미가 있음
                     continue
 
-                lat = row[COL_LAT]
-                lng = row[COL_LNG]
-                lat = None if pd.isna(lat) else float(lat)
-                lng = None if pd.isna(lng) else float(lng)
-
-                def safe_int(v, default=0):
-                    if v is None or (isinstance(v, float) and pd.isna(v)):
-                        return int(default)
-                    return int(v)
-
-                out_rows.append({
-                    "name": row[COL_NAME],
-                    "region_id": int(region_id),
-                    "type_id": int(type_id),
-                    "address": row[COL_ADDRESS],
-                    "phone": row[COL_PHONE],
-                    "latitude": lat,
-                    "longitude": lng,
-
-                    "is_ev": safe_int(row[COL_IS_EV], 0),
-                    "is_ev_tech": safe_int(row[COL_IS_EV_TECH], 0),
-                    "is_hydrogen": safe_int(row[COL_IS_HYDROGEN], 0),
-                    "is_hydrogen": safe_int(row[COL_IS_HYDROGEN], 0),
-                    "is_frame": safe_int(row[COL_IS_FRAME], 0),
-                    "is_al_frame": safe_int(row[COL_IS_AL_FRAME], 0),
-                    "is_n_line": safe_int(row[COL_IS_N_LINE], 0),
-                    "is_commercial_mid": safe_int(row[COL_IS_COMMERCIAL_MID], 0),
-                    "is_commercial_big": safe_int(row[COL_IS_COMMERCIAL_BIG], 0),
-                    "is_commercial_ev": safe_int(row[COL_IS_COMMERCIAL_EV], 0),
-                    "is_cs_excellent": safe_int(row[COL_IS_CS_EXCELLENT], 0),
-                })
-
-            # 8) bluehands insert
-            insert_bluehands(cur, out_rows)
+                # 5) bluehands 적재 (sync: 차이만 반영 / insert: 전부 INSERT)
+                if args.mode == "sync":
+                    diff = sync_bluehands(cur, out_rows, method=args.load, batch_size=args.batch_size)
+                    for k, v in diff.items():
+                        totals[k] += v
+                    uncommitted_changes += diff["added"] + diff["changed"]
+                else:
+                    used = bulk_insert(cur, out_rows, method=args.load, batch_size=args.batch_size)
+                    totals["added"] += len(out_rows)
+                    uncommitted_changes += len(out_rows)
+
+                # 6) 중간 commit (트랜잭션/undo 로그가 파일 크기만큼 커지지 않게)
+                #    바뀐 행이 있으면 같은 트랜잭션에서 데이터 버전도 올린다.
+                #    (앱은 버전이 바뀌어야 캐시를 버리므로, 중간 commit이 보이는 시점에 버전도 같이 바뀌어야 한다.
+                #     중간에 실패해도 이미 commit된 청크는 새 버전으로 보인다)
+                if args.commit_every and n % args.commit_every == 0:
+                    if uncommitted_changes:
+                        data_version = bump_data_version(cur)
+                        uncommitted_changes = 0
+                    conn.commit()
+                    print(f"  ... {totals['read']:,} rows read, committed (chunk {n})")
+
+            if args.compare:
+                # 차원 테이블(regions / service_types)도 commit 하지 않고 비교 끝에 같이 rollback
+                compare_load_methods(conn, compare_rows, args.batch_size)
+                return
+
+            # 7) sync: 이번 CSV에 없는 지점 삭제
+            if args.mode == "sync":
+                totals["removed"] = delete_missing_branches(cur, seen_keys, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - started
+
+            # 8) 데이터 버전 올리기 (마지막 중간 commit 이후 바뀐 게 없으면 그대로 두어 앱 캐시를 유지)
+            if uncommitted_changes or totals["removed"]:
+                data_version = bump_data_version(cur)
 
         conn.commit()
         print("[OK] Import completed.")
-        print(f"  regions: {len(regions)}")
-        print(f"  service_types: {len(types)}")
-        print(f"  bluehands: {len(df)} (rows after cleaning), inserted: {len(out_rows)}")
+        print(f"  regions: {len(seen_regions)}")
+        print(f"  service_types: {len(seen_types)}")
+        print(
+            f"  bluehands: {totals['read']} read, {totals['cleaned']} (rows after cleaning), "
+            f"mapped: {totals['mapped']}"
+        )
+        if args.mode == "sync":
+            print(
+                f"  sync: added {totals['added']}, changed {totals['changed']}, "
+                f"removed {totals['removed']}, unchanged {totals['unchanged']} ({elapsed:.3f}s)"
+            )
+        else:
+            print(f"  insert: {totals['added']} rows via {used} ({elapsed:.3f}s)")
+        if data_version is None:
+            print("  data_version: unchanged")
+        else:
+            print(f"  data_version: {data_version}")
 
     except Exception as e:
         conn.rollback()
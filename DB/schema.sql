@@ -1,7 +1,7 @@
 -- schema.sql
 -- 현재 프로젝트 DB 스키마(스크린샷 기준)
 -- 초기 세팅용입니다. 초기 한번 실행하는걸 권장합니다.
--- regions / service_types / bluehands
+-- regions / service_types / bluehands / meta
 
 CREATE DATABASE IF NOT EXISTS bluehands_db
   DEFAULT CHARACTER SET utf8mb4
@@ -13,6 +13,7 @@ USE bluehands_db;
 DROP TABLE IF EXISTS bluehands;
 DROP TABLE IF EXISTS service_types;
 DROP TABLE IF EXISTS regions;
+-- meta는 지우지 않는다: data_version은 스키마를 다시 만들어도 이전 값보다 커야 한다(앱 캐시 키)
 
 -- 1) 지역 테이블
 CREATE TABLE regions (
@@ -34,6 +35,9 @@ CREATE TABLE service_types (
 CREATE TABLE bluehands (
   id INT NOT NULL AUTO_INCREMENT,
 
+  -- 자연키: sha1(지점명 + 정규화 주소). 재적재 시 upsert(sync) 기준
+  branch_key CHAR(40) NOT NULL,
+
   name      VARCHAR(200) NOT NULL,
   region_id INT NOT NULL,
   type_id   INT NOT NULL,
@@ -41,8 +45,24 @@ CREATE TABLE bluehands (
   address   VARCHAR(300) NULL,
   phone     VARCHAR(50)  NULL,
 
-  latitude  DOUBLE NULL,
-  longitude DOUBLE NULL,
+  -- 주소를 적재 시점에 나눠둔 행정구역 (importer가 채움, 시/도 표기는 표준명으로 통일)
+  --  예) "서울 강남구 테헤란로 123 (역삼동)" -> 서울특별시 / 강남구 / 역삼동
+  sido  VARCHAR(20) NULL,
+  gugun VARCHAR(30) NULL,
+  dong  VARCHAR(30) NULL,
+
+  latitude  DOUBLE NOT NULL,
+  longitude DOUBLE NOT NULL,
+
+  -- 공간 검색용 좌표(WGS84). latitude/longitude로부터 자동 계산되는 STORED 컬럼
+  --  - POINT(경도, 위도) 순서로 만들고 SRID 4326을 붙인다.
+  --  - ST_Distance_Sphere / MBRContains 가 SPATIAL INDEX를 타도록 NOT NULL + SRID 고정
+  location POINT GENERATED ALWAYS AS (ST_SRID(POINT(longitude, latitude), 4326)) STORED NOT NULL SRID 4326,
+
+  -- geohash 셀 id(9자리 ≈ 5m 격자). importer가 위경도로 계산해서 넣는다.
+  --  - 반경 검색 시 원을 덮는 셀 prefix(LIKE 'wydm9%')로 B-tree 인덱스만 타고 후보를 좁힌다.
+  --  - SPATIAL INDEX를 쓸 수 없는 MySQL에서의 근접 검색 경로
+  geohash CHAR(9) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
 
   is_ev        TINYINT(1) NOT NULL DEFAULT 0,
   is_ev_tech          TINYINT(1) NOT NULL DEFAULT 0,
@@ -55,10 +75,27 @@ CREATE TABLE bluehands (
   is_commercial_ev    TINYINT(1) NOT NULL DEFAULT 0,
   is_cs_excellent     TINYINT(1) NOT NULL DEFAULT 0,
 
+  -- 위 is_* 플래그를 비트로 묶은 값 (importer가 채움, 비트 순서는 Function/flags.py FLAG_COLS)
+  --  - bit0 is_ev, bit1 is_ev_tech, bit2 is_hydrogen, bit3 is_frame, bit4 is_al_frame,
+  --    bit5 is_n_line, bit6 is_commercial_mid, bit7 is_commercial_big, bit8 is_commercial_ev,
+  --    bit9 is_cs_excellent
+  --  - 여러 옵션 AND 필터를 (service_mask & m) = m 한 번으로 처리한다.
+  service_mask SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+
   PRIMARY KEY (id),
+  UNIQUE KEY uk_bluehands_branch_key (branch_key),
 
   KEY idx_bluehands_region_id (region_id),
   KEY idx_bluehands_type_id (type_id),
+  KEY idx_bluehands_sido_gugun_dong (sido, gugun, dong),
+  SPATIAL INDEX sidx_bluehands_location (location),
+  KEY idx_bluehands_geohash (geohash),
+
+  -- 지점명/주소 검색용 FULLTEXT (한국어는 공백 단위가 아니라 ngram 파서로 2글자씩 인덱싱)
+  --  - 앱은 MATCH(name, address) AGAINST ('+"강남" +"현대"' IN BOOLEAN MODE) 로 조회한다.
+  --  - ngram_token_size 기본값(2) 기준. 영문 불용어가 섞인 n-gram이 빠지는 게 싫으면
+  --    innodb_ft_enable_stopword=OFF 로 두고 인덱스를 만든다.
+  FULLTEXT KEY ftx_bluehands_name_address (name, address) WITH PARSER ngram,
 
   CONSTRAINT fk_bluehands_region
     FOREIGN KEY (region_id) REFERENCES regions(id)
@@ -69,3 +106,19 @@ CREATE TABLE bluehands (
     ON UPDATE CASCADE ON DELETE RESTRICT
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- 4) 메타 테이블 (name -> 정수 값)
+--  - data_version: importer가 bluehands를 바꿀 때마다 같은 트랜잭션에서 올린다.
+--    앱의 캐시 로더는 이 값을 캐시 키로 써서 재적재 직후에만 다시 읽는다. (Function/db.py get_data_version)
+--  - 값은 절대 되돌아가면 안 된다(예전 버전으로 캐시된 항목이 다시 쓰임).
+--    그래서 새 값 = max(이전 값 + 1, 현재 시각(마이크로초)) 이고, 이 스크립트를 다시 실행해도 값이 커진다.
+CREATE TABLE IF NOT EXISTS meta (
+  name       VARCHAR(50) NOT NULL,
+  value      BIGINT UNSIGNED NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 테이블을 새로 만들었으니(데이터가 비었으니) 버전도 올린다
+INSERT INTO meta (name, value)
+VALUES ('data_version', CAST(UNIX_TIMESTAMP(NOW(6)) * 1000000 AS UNSIGNED))
+ON DUPLICATE KEY UPDATE value = GREATEST(value + 1, CAST(UNIX_TIMESTAMP(NOW(6)) * 1000000 AS UNSIGNED));
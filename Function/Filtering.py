@@ -1,18 +1,34 @@
 import streamlit as st
-import mysql.connector
 import pandas as pd
+import os
+import sys
+
+# 저장소 루트의 Function/ 공용 모듈을 쓰기 위해 경로 추가 (streamlit run Function/Filtering.py 로 실행해도 동작)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Function.db import get_conn  # 공용 MySQL 커넥션 풀
 
 st.title("📍 지역 선택 (셀렉트박스 1개)")
 
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="mysql",
-    database="bluehands_db",
-    charset="utf8mb4"
-)
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "mysql",
+    "database": "bluehands_db",
+    "charset": "utf8mb4"
+}
+
+# 쿼리마다 공용 커넥션 풀에서 연결을 빌리고 끝나면 바로 반납
+# (rerun / st.stop / 쿼리 에러로 스크립트가 중간에 끝나도 연결이 풀로 돌아가도록 finally에서 close)
+def read_sql(sql, params=None):
+    conn = get_conn(DB_CONFIG)
+    try:
+        return pd.read_sql(sql, conn, params=params)
+    finally:
+        conn.close()
 
-BASE_WHERE = "address IS NOT NULL AND address <> ''"
+# sido / gugun 은 importer가 주소를 미리 파싱해서 넣어둔 컬럼 (Function/address.py)
+# (sido, gugun, dong) 복합 인덱스로 조회하므로 주소 문자열을 매번 자르지 않음
+BASE_WHERE = "sido IS NOT NULL"
 
 # --- rerun 호환 (버전 차이 대응) ---
 def do_rerun():
@@ -33,22 +49,22 @@ if "region_pick" not in st.session_state:
 
 # --- 데이터 로더 ---
 def load_sido():
-    df = pd.read_sql(f"""
-        SELECT DISTINCT TRIM(SUBSTRING_INDEX(address, ' ', 1)) AS sido
+    df = read_sql(f"""
+        SELECT DISTINCT sido
           FROM bluehands
          WHERE {BASE_WHERE}
          ORDER BY sido
-    """, conn)
+    """)
     return ["(전체)"] + df["sido"].dropna().tolist()
 
 def load_gugun(sido: str):
-    df = pd.read_sql(f"""
-        SELECT DISTINCT TRIM(SUBSTRING_INDEX(SUBSTRING_INDEX(address, ' ', 2), ' ', -1)) AS gugun
+    df = read_sql(f"""
+        SELECT DISTINCT gugun
           FROM bluehands
-         WHERE {BASE_WHERE}
-           AND TRIM(SUBSTRING_INDEX(address, ' ', 1)) = %s
+         WHERE sido = %s
+           AND gugun IS NOT NULL
          ORDER BY gugun
-    """, conn, params=(sido,))
+    """, params=(sido,))
     return ["← 시/도 다시 선택", "(전체)"] + df["gugun"].dropna().tolist()
 
 # --- 선택 변경 시 실행될 콜백 ---
@@ -93,5 +109,3 @@ st.selectbox(
 )
 
 st.write("선택:", st.session_state.selected_sido, ">", st.session_state.selected_gugun)
-
-conn.close()
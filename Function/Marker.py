@@ -1,6 +1,6 @@
 import os
+import sys
 import streamlit as st
-import mysql.connector
 import folium
 from folium.plugins import LocateControl
 from streamlit_folium import st_folium
@@ -10,6 +10,11 @@ import time
 import math
 from math import radians, cos, sin, asin, sqrt
 
+# 저장소 루트의 Function/ 공용 모듈을 쓰기 위해 경로 추가 (streamlit run Function/xxx.py 로 실행해도 동작)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Function.db import get_conn, get_data_version  # 공용 MySQL 커넥션 풀 / 데이터 버전
+from Function.fulltext import search_condition  # 지점명/주소 FULLTEXT(ngram) 검색 조건
+
 # -----------------------------------------------------------------------------
 # 0. 거리 계산 함수 - 하버사인 공식
 # -----------------------------------------------------------------------------
@@ -37,35 +42,41 @@ if os.getenv("STREAMLIT_PARENT") != "1":
 # -----------------------------------------------------------------------------
 # 2. 데이터베이스 연결 및 조회 함수
 # -----------------------------------------------------------------------------
-@st.cache_data(ttl=600)
-def get_bluehands_data(search_text):
-    results = []
+# ⚠️ DB 정보 확인
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "root",
+    "database": "bluehands_db"
+}
+
+@st.cache_data(max_entries=256)
+def _fetch_bluehands_data(search_text, data_version):
+    # data_version: 캐시 키 (재적재로 버전이 바뀔 때만 다시 읽는다). 실패는 캐시되지 않도록 예외를 올린다.
     conn = None
     cursor = None
     try:
-        # ⚠️ DB 정보 확인
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="root",
-            database="bluehands_db"
-        )
+        conn = get_conn(DB_CONFIG)  # 공용 커넥션 풀에서 빌림 (conn.close() 하면 풀로 반납)
         cursor = conn.cursor(dictionary=True)
-        query = "SELECT name, latitude, longitude, address, phone FROM bluehands_db.bluehands"
-        params = []
-        if search_text:
-            query += " WHERE name LIKE %s OR address LIKE %s"
-            pattern = f"%{search_text}%"
-            params = [pattern, pattern]
+        # 검색어는 FULLTEXT(ngram) 인덱스로 찾고, MATCH 점수(relevance) 높은 순으로 정렬
+        search_sql, search_params, score_sql, score_params = search_condition(search_text, alias="")
+        query = f"SELECT name, latitude, longitude, address, phone, {score_sql} AS relevance FROM bluehands_db.bluehands"
+        params = list(score_params)
+        if search_sql:
+            query += f" WHERE {search_sql} ORDER BY relevance DESC"
+            params += search_params
         cursor.execute(query, params)
-        results = cursor.fetchall()
-    except Exception as e:
-        st.error(f"DB Error: {e}")
-        return []
+        return cursor.fetchall()
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
-    return results
+
+def get_bluehands_data(search_text):
+    try:
+        return _fetch_bluehands_data(search_text, get_data_version(DB_CONFIG))
+    except Exception as e:
+        st.error(f"DB Error: {e}")
+        return []
 
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,95 @@
+# File: address.py
+# 목적:
+#  - 지점 주소 문자열을 시/도(sido) · 구/군(gugun) · 동/읍/면(dong) 으로 나눈다.
+#  - importer가 적재할 때 한 번만 계산해서 bluehands.sido / gugun / dong 컬럼에 넣는다.
+#    (화면에서 SUBSTRING_INDEX로 매번 잘라내면 드롭다운/필터마다 풀스캔이 된다)
+#  - 시/도 표기는 하나로 통일한다. (강원도 / 강원 / 강원특별자치도 -> 강원특별자치도)
+#
+# 예:
+#   "서울 강남구 테헤란로 123 (역삼동)"       -> ("서울특별시", "강남구", "역삼동")
+#   "경기도 수원시 영통구 매탄동 123"         -> ("경기도", "수원시", "매탄동")
+#   "세종특별자치시 한누리대로 2130"          -> ("세종특별자치시", None, None)
+
+import re
+import unicodedata
+from typing import Optional, Tuple
+import pandas as pd
+
+
+# 표준 시/도 이름 -> 주소에 나올 수 있는 다른 표기들
+SIDO_CANONICAL = {
+    "서울특별시": ["서울", "서울시"],
+    "부산광역시": ["부산", "부산시"],
+    "대구광역시": ["대구", "대구시"],
+    "인천광역시": ["인천", "인천시"],
+    "광주광역시": ["광주", "광주시"],
+    "대전광역시": ["대전", "대전시"],
+    "울산광역시": ["울산", "울산시"],
+    "세종특별자치시": ["세종", "세종시"],
+    "경기도": ["경기"],
+    "강원특별자치도": ["강원", "강원도"],
+    "충청북도": ["충북"],
+    "충청남도": ["충남"],
+    "전북특별자치도": ["전북", "전라북도"],
+    "전라남도": ["전남"],
+    "경상북도": ["경북"],
+    "경상남도": ["경남"],
+    "제주특별자치도": ["제주", "제주도"],
+}
+
+# 주소 "첫 단어"에만 적용하므로 "광주"는 광주광역시로 본다 (경기도 광주시는 "경기도 광주시 ..."로 시작)
+SIDO_ALIASES = {alias: name for name, aliases in SIDO_CANONICAL.items() for alias in aliases + [name]}
+
+_GUGUN_RE = re.compile(r"^\S+(시|군|구)$")
+_DONG_RE = re.compile(r"^(\S+(동|읍|면|리)|\S+\d가)$")  # 가는 "종로1가"처럼 숫자+가만
+_DONG_PAREN_RE = re.compile(r"\(([^,)\s]+\d가|[^,)\s]+(?:동|읍|면|리))")
+
+
+def normalize_sido(token: Optional[str]) -> Optional[str]:
+    if not token:
+        return None
+    return SIDO_ALIASES.get(unicodedata.normalize("NFC", token).strip())
+
+
+def parse_address(address) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    # 주소 1개 -> (sido, gugun, dong). 알 수 없는 부분은 None
+    if address is None or (isinstance(address, float) and pd.isna(address)):
+        return None, None, None
+    text = re.sub(r"\s+", " ", unicodedata.normalize("NFC", str(address))).strip()
+    tokens = text.split(" ")
+    if not tokens or not tokens[0]:
+        return None, None, None
+
+    sido = normalize_sido(tokens[0])
+    rest = tokens[1:] if sido else tokens
+
+    # 구/군: 시/도 다음 첫 단어가 시·군·구로 끝날 때만 (세종처럼 없는 곳은 None)
+    gugun = rest[0] if rest and _GUGUN_RE.match(rest[0]) else None
+    if gugun:
+        rest = rest[1:]
+        # "수원시 영통구"처럼 시 아래 구가 한 번 더 나오면 건너뛴다
+        if rest and rest[0].endswith("구") and _GUGUN_RE.match(rest[0]):
+            rest = rest[1:]
+
+    # 동/읍/면: 지번 주소면 바로 다음 단어, 도로명 주소면 끝의 괄호 "(역삼동, ...)" 에서
+    dong = None
+    if rest and _DONG_RE.match(rest[0]) and not rest[0][:-1].isdigit():
+        dong = rest[0]
+    else:
+        m = _DONG_PAREN_RE.search(text)
+        if m:
+            dong = m.group(1)
+    return sido, gugun, dong
+
+
+def parse_address_series(s: pd.Series) -> pd.DataFrame:
+    # 주소 컬럼 전체 -> sido / gugun / dong 3개 컬럼 DataFrame (index 유지)
+    # 같은 주소가 반복되는 경우가 있어서 고유값만 파싱한 뒤 행마다 꺼내 쓴다.
+    uniq = pd.unique(s.dropna())
+    parsed = {a: parse_address(a) for a in uniq}
+    out = pd.DataFrame(
+        [parsed.get(a, (None, None, None)) if pd.notna(a) else (None, None, None) for a in s],
+        columns=["sido", "gugun", "dong"],
+        index=s.index,
+    )
+    return out.astype(object).where(out.notna(), None)
@@ -0,0 +1,175 @@
+# File: db.py
+# 목적:
+#  - 앱 전체가 같이 쓰는 MySQL 커넥션 풀(mysql.connector.pooling).
+#    쿼리마다 TCP 연결 + 인증을 새로 하던 비용을 없앤다.
+#  - 풀은 프로세스당 1개(접속 정보별 1개)만 만들고 st.cache_resource로 세션끼리 공유한다.
+#  - get_conn()으로 빌린 연결은 기존 코드처럼 conn.close() 하면 끊기지 않고 풀로 반납된다.
+#
+# 상태 관리:
+#  - health check: 빌려줄 때 pooling이 is_connected()(ping)로 확인하고, 끊겼으면 재접속한다.
+#  - recycle: 만든 지 MYSQL_POOL_RECYCLE초가 지난 연결은 빌려줄 때 새로 접속한다.
+#             (서버 wait_timeout / 방화벽 idle timeout으로 조용히 끊긴 연결 방지)
+#  - 풀이 다 차 있으면 MYSQL_POOL_TIMEOUT초까지 기다렸다가 그래도 없으면 PoolError.
+#
+# 데이터 버전:
+#  - importer가 적재할 때마다 meta 테이블의 data_version을 올린다(항상 이전 값보다 커짐, 되돌아가지 않음).
+#  - get_data_version()은 그 값을 PK 조회 1번으로 읽는다(DATA_VERSION_TTL초 동안은 메모리 값 재사용).
+#  - 캐시 로더는 TTL 대신 이 값을 인자로 받아 캐시 키로 쓴다.
+#    -> 재적재 전까지는 캐시를 계속 쓰고, 재적재 직후에는 바로 새로 읽는다.
+#
+# 환경변수(없으면 기본값):
+#  - MYSQL_HOST / DB_HOST (default: localhost)
+#  - MYSQL_PORT / DB_PORT (default: 3306)
+#  - MYSQL_USER / DB_USER (default: root)
+#  - MYSQL_PASSWORD / DB_PASSWORD (default: )
+#  - MYSQL_DB / DB_NAME (default: bluehands_db)
+#  - MYSQL_POOL_SIZE (default: 8, 최대 32)
+#  - MYSQL_POOL_RECYCLE (default: 1800초, 0이면 끔)
+#  - MYSQL_POOL_TIMEOUT (default: 5초)
+#  - DATA_VERSION_TTL (default: 2초, 버전 조회 결과를 재사용하는 시간)
+
+import os
+import time
+import hashlib
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from mysql.connector import pooling
+
+try:
+    import streamlit as st
+    _cache_resource = st.cache_resource
+except ImportError:  # streamlit 없이(배치 스크립트 등) 쓸 때
+    _cache_resource = lru_cache(maxsize=None)
+
+
+def _env(*names: str, default: Optional[str] = None) -> Optional[str]:
+    for name in names:
+        value = os.getenv(name)
+        if value:
+            return value
+    return default
+
+
+DB_CONFIG: Dict[str, Any] = {
+    "host": _env("MYSQL_HOST", "DB_HOST", default="localhost"),
+    "port": int(_env("MYSQL_PORT", "DB_PORT", default="3306")),
+    "user": _env("MYSQL_USER", "DB_USER", default="root"),
+    "password": _env("MYSQL_PASSWORD", "DB_PASSWORD", default=""),
+    "database": _env("MYSQL_DB", "DB_NAME", default="bluehands_db"),
+    "charset": "utf8mb4",
+}
+
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "8"))
+POOL_RECYCLE = float(os.getenv("MYSQL_POOL_RECYCLE", "1800"))
+POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+DATA_VERSION_TTL = float(os.getenv("DATA_VERSION_TTL", "2"))
+
+DATA_VERSION_KEY = "data_version"  # meta.name (DB/schema.sql, importer와 같은 값)
+
+
+class ConnectionPool:
+    # 목적:
+    #  - mysql.connector.pooling.MySQLConnectionPool에 recycle / 대기(acquire timeout) / 통계를 더한 래퍼
+
+    def __init__(self, config: Dict[str, Any], size: int = POOL_SIZE,
+                 recycle: float = POOL_RECYCLE, timeout: float = POOL_TIMEOUT):
+        key = hashlib.sha1(repr(sorted(config.items())).encode("utf-8")).hexdigest()[:12]
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name=f"bluehands_{key}",
+            pool_size=max(1, min(size, pooling.CNX_POOL_MAXSIZE)),
+            pool_reset_session=True,
+            **config,
+        )
+        self.recycle = recycle
+        self.timeout = timeout
+        self._born: Dict[int, float] = {}  # id(실제 연결) -> 접속 시각
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def get_connection(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                conn = self._pool.get_connection()
+                break
+            except pooling.PoolError:
+                # 풀이 다 빌려준 상태 -> 반납될 때까지 잠깐씩 기다림
+                if time.monotonic() >= deadline:
+                    self.stats["exhausted"] += 1
+                    raise
+                self.stats["waits"] += 1
+                time.sleep(0.02)
+
+        # 오래된 연결은 새로 접속 (PooledMySQLConnection 안의 실제 연결 기준)
+        cnx = conn._cnx
+        now = time.monotonic()
+        with self._lock:
+            born = self._born.setdefault(id(cnx), now)
+        if self.recycle and now - born > self.recycle:
+            try:
+                cnx.reconnect(attempts=2, delay=0)
+            except Exception:
+                conn.close()  # 실패해도 풀 자리는 돌려놓는다
+                raise
+            with self._lock:
+                self._born[id(cnx)] = time.monotonic()
+            self.stats["recycled"] += 1
+
+        self.stats["checkouts"] += 1
+        return conn
+
+
+def _freeze(config: Dict[str, Any]) -> Tuple:
+    # cache 키로 쓸 수 있게 tuple로 (값이 None인 항목은 커넥터 기본값을 쓰도록 뺀다)
+    return tuple(sorted((k, v) for k, v in config.items() if v is not None))
+
+
+@_cache_resource
+def _get_pool(frozen_config: Tuple) -> ConnectionPool:
+    return ConnectionPool(dict(frozen_config))
+
+
+def get_pool(config: Optional[Dict[str, Any]] = None) -> ConnectionPool:
+    return _get_pool(_freeze(config or DB_CONFIG))
+
+
+def get_conn(config: Optional[Dict[str, Any]] = None):
+    # 풀에서 연결 1개 빌리기. 다 쓰면 conn.close()로 반납한다.
+    return get_pool(config).get_connection()
+
+
+_version_lock = threading.Lock()
+_version_cache: Dict[Tuple, Tuple[float, int]] = {}  # 접속 정보 -> (읽은 시각, 버전)
+
+
+def get_data_version(config: Optional[Dict[str, Any]] = None) -> int:
+    # 목적:
+    #  - 현재 데이터 버전(meta.data_version). 재적재마다 커진다(schema.sql을 다시 실행해도 되돌아가지 않음).
+    #  - DATA_VERSION_TTL초 안에 다시 부르면 DB에 묻지 않고 직전 값을 돌려준다.
+    #  - meta 테이블/행이 아직 없으면 0, DB에 못 붙으면 마지막으로 읽은 값(없으면 0)
+    key = _freeze(config or DB_CONFIG)
+    now = time.monotonic()
+    with _version_lock:
+        cached = _version_cache.get(key)
+    if cached and now - cached[0] < DATA_VERSION_TTL:
+        return cached[1]
+
+    try:
+        conn = get_conn(config)
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT value FROM meta WHERE name = %s", (DATA_VERSION_KEY,))
+            row = cur.fetchone()
+            cur.close()
+        finally:
+            conn.close()
+        version = int(row[0]) if row else 0
+    except Exception:
+        version = cached[1] if cached else 0
+
+    with _version_lock:
+        _version_cache[key] = (now, version)
+    return version
@@ -0,0 +1,113 @@
+# File: flags.py
+# 목적:
+#  - 서비스 플래그(is_*)를 한 곳에서 정의하는 레지스트리.
+#    final.py / middle.py / Function/service_labels.py / importer가 같은 정의를 쓴다.
+#  - 10개 플래그를 비트 하나씩 묶은 bluehands.service_mask 정수를 다룬다.
+#    필터: (service_mask & m) = m  /  라벨·뱃지: mask -> 미리 계산된 라벨 튜플 조회
+#
+# 주의:
+#  - FLAG_COLS 순서가 곧 비트 번호다(0번 = is_ev). 이미 적재된 service_mask 값이 바뀌므로
+#    순서를 바꾸거나 중간에 끼워 넣지 말고, 새 플래그는 맨 뒤에 추가한다.
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+# 비트 순서 (schema.sql 컬럼 순서와 같음)
+FLAG_COLS: List[str] = [
+    "is_ev",
+    "is_ev_tech",
+    "is_hydrogen",
+    "is_frame",
+    "is_al_frame",
+    "is_n_line",
+    "is_commercial_mid",
+    "is_commercial_big",
+    "is_commercial_ev",
+    "is_cs_excellent",
+]
+FLAG_BITS: Dict[str, int] = {col: 1 << i for i, col in enumerate(FLAG_COLS)}
+ALL_FLAGS_MASK = (1 << len(FLAG_COLS)) - 1
+
+# 플래그 컬럼명 -> 사용자 표시 라벨(한글). dict 선언 순서가 곧 표시 순서다.
+FLAG_LABELS: Dict[str, str] = {
+    # 1) 친환경차 관련
+    "is_ev": "전기차 수리",
+    "is_ev_tech": "전동차 기술력 우수",
+    "is_hydrogen": "수소전기차 수리",
+
+    # 2) 차체/도장 및 특수 수리
+    "is_frame": "차체/도장 수리 인증",
+    "is_al_frame": "알루미늄 프레임 수리",
+    "is_n_line": "고성능 N 모델 수리",
+
+    # 3) 상용차(특화/버스) 관련
+    "is_commercial_mid": "중형 상용 수리",
+    "is_commercial_big": "대형 상용 수리",
+    "is_commercial_ev": "상용 전동차 수리",
+
+    # 4) CS 우수
+    "is_cs_excellent": "CS 우수",
+}
+
+# 앱 사이드바 "서비스 옵션" 필터 (화면에 노출하는 5개, 표시 순서대로)
+FILTER_OPTIONS: Dict[str, str] = {
+    "is_ev": "⚡ 전기차 전담",
+    "is_hydrogen": "💧 수소차 전담",
+    "is_frame": "🔨 판금/차체 수리",
+    "is_cs_excellent": "🏆 우수 협력점",
+    "is_n_line": "🏎️ N-Line 전담",
+}
+
+
+def is_truthy_flag(value: Any) -> bool:
+    # DB/CSV 값 타입이 섞여도 "참(1)"인지 판정 (1 / True / "1" / "Y" / "true" ...)
+    if value is None:
+        return False
+    if isinstance(value, bool):  # bool이 int의 서브클래스이므로 먼저 처리
+        return value
+    if isinstance(value, (int, float)):
+        return value == 1
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "y", "yes", "true", "t")
+    return False
+
+
+def mask_from_cols(cols: Iterable[str]) -> int:
+    # ["is_ev", "is_frame"] -> 0b1001
+    mask = 0
+    for col in cols or []:
+        mask |= FLAG_BITS[col]
+    return mask
+
+
+def mask_from_row(row: Dict[str, Any]) -> int:
+    # 행에 service_mask가 있으면 그대로, 없으면 is_* 컬럼으로 계산
+    mask = row.get("service_mask")
+    if mask is not None:
+        return int(mask)
+    return mask_from_cols(col for col in FLAG_COLS if is_truthy_flag(row.get(col)))
+
+
+def cols_from_mask(mask: int) -> List[str]:
+    return [col for col in FLAG_COLS if mask & FLAG_BITS[col]]
+
+
+def mask_condition(cols: Iterable[str], alias: str = "a") -> Tuple[str, list]:
+    # 목적:
+    #  - 선택한 서비스 옵션들(AND) -> "(a.service_mask & %s) = %s" 조건 1개
+    #  - 선택이 없으면 ("", []) : 호출부에서 조건을 추가하지 않는다.
+    mask = mask_from_cols(cols)
+    if not mask:
+        return "", []
+    prefix = f"{alias}." if alias else ""
+    return f"({prefix}service_mask & %s) = %s", [mask, mask]
+
+
+@lru_cache(maxsize=None)
+def labels_for_mask(mask: int, options: Tuple[Tuple[str, str], ...] = tuple(FLAG_LABELS.items())) -> Tuple[str, ...]:
+    # mask -> 켜진 플래그 라벨 튜플 (options 순서). 가능한 mask가 2^10개라 전부 캐시해도 작다.
+    return tuple(label for col, label in options if mask & FLAG_BITS[col])
+
+
+FILTER_OPTION_ITEMS = tuple(FILTER_OPTIONS.items())  # labels_for_mask(mask, FILTER_OPTION_ITEMS) 용
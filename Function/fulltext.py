@@ -0,0 +1,84 @@
+# File: fulltext.py
+# 목적:
+#  - 지점명/주소 검색을 LIKE '%...%'(항상 풀스캔) 대신
+#    FULLTEXT(ngram) 인덱스 ftx_bluehands_name_address 를 타는 MATCH ... AGAINST 로 만든다.
+#  - 검색어는 공백 기준 단어로 나누고, 단어끼리는 AND(+) 조건이다. ("강남 현대" -> +"강남" +"현대")
+#  - MATCH 점수(relevance)를 같이 돌려줘서 ORDER BY 정렬 키로 쓸 수 있게 한다.
+#
+# 주의:
+#  - ngram 파서는 ngram_token_size(기본 2)보다 짧은 단어를 인덱싱하지 못한다.
+#    1글자 단어는 그 단어만 LIKE로 대체한다.
+#  - MATCH(컬럼들)은 FULLTEXT 인덱스 컬럼 목록과 순서까지 같아야 한다: (name, address)
+#  - LIKE 대체 시 단어 안의 %, _, \ 는 와일드카드가 아니라 글자 그대로 찾도록 이스케이프한다.
+
+import re
+from typing import List, Tuple
+
+
+FULLTEXT_COLUMNS = ("name", "address")  # schema.sql ftx_bluehands_name_address 와 같은 순서
+NGRAM_TOKEN_SIZE = 2                    # MySQL ngram_token_size 기본값
+
+# boolean mode 연산자로 해석될 수 있는 문자는 검색어에서 뺀다
+_BOOLEAN_OPS = re.compile(r'[+\-<>()~*"@]')
+
+# LIKE 패턴에서 특별한 의미가 있는 문자 (이스케이프 문자 자신 포함)
+_LIKE_SPECIAL = re.compile(r"([\\%_])")
+
+
+def split_tokens(search_text: str) -> List[str]:
+    # 공백 기준 단어 분리 (빈 단어 / 연산자만 있는 단어 제외)
+    tokens = [_BOOLEAN_OPS.sub("", t) for t in re.split(r"\s+", search_text or "")]
+    return [t for t in tokens if t]
+
+
+def boolean_query(tokens: List[str]) -> str:
+    # ["강남", "현대"] -> '+"강남" +"현대"'
+    #  - 따옴표로 감싸면 ngram 파서가 단어를 n-gram 구(phrase)로 검색한다(부분 문자열 검색과 같은 효과).
+    return " ".join(f'+"{t}"' for t in tokens)
+
+
+def like_escape(value: str) -> str:
+    # "50%" -> "50\%" : LIKE ... ESCAPE '\' 와 같이 써서 %, _ 를 글자 그대로 비교
+    return _LIKE_SPECIAL.sub(r"\\\1", value)
+
+
+def like_contains(value: str) -> str:
+    # 부분 문자열 검색용 패턴: '%<이스케이프된 값>%'
+    return f"%{like_escape(value)}%"
+
+
+def match_sql(alias: str = "a") -> str:
+    prefix = f"{alias}." if alias else ""
+    cols = ", ".join(prefix + c for c in FULLTEXT_COLUMNS)
+    return f"MATCH({cols}) AGAINST (%s IN BOOLEAN MODE)"
+
+
+def search_condition(search_text: str, alias: str = "a") -> Tuple[str, list, str, list]:
+    # 목적:
+    #  - 검색어 -> (WHERE 조건 SQL, 조건 params, 점수 SQL, 점수 params)
+    #  - 검색어가 비었으면 조건은 "" (호출부에서 조건 추가 안 함), 점수는 "0"
+    #
+    # 사용 예:
+    #   cond, cond_params, score, score_params = search_condition("강남 현대")
+    #   SELECT ..., {score} AS relevance FROM bluehands a WHERE {cond} ORDER BY relevance DESC
+    #   params = score_params + cond_params
+    prefix = f"{alias}." if alias else ""
+    tokens = split_tokens(search_text)
+    long_tokens = [t for t in tokens if len(t) >= NGRAM_TOKEN_SIZE]
+    short_tokens = [t for t in tokens if len(t) < NGRAM_TOKEN_SIZE]
+
+    parts, params = [], []
+    score_sql, score_params = "0", []
+    if long_tokens:
+        q = boolean_query(long_tokens)
+        parts.append(match_sql(alias))
+        params.append(q)
+        score_sql, score_params = match_sql(alias), [q]
+
+    for t in short_tokens:
+        # SQL 문자열 리터럴 '\\' = 백슬래시 1개 (이스케이프 문자)
+        parts.append(f"({prefix}name LIKE %s ESCAPE '\\\\' OR {prefix}address LIKE %s ESCAPE '\\\\')")
+        pattern = like_contains(t)
+        params.extend([pattern, pattern])
+
+    return " AND ".join(parts), params, score_sql, score_params
@@ -0,0 +1,75 @@
+# File: geo.py
+# 목적:
+#  - 결과 행 전체에 대해 "내 위치 -> 지점" 거리를 numpy로 한 번에 계산한다(행마다 haversine 호출 X).
+#  - 계산한 거리는 distance_m(미터) 컬럼으로 붙여서
+#    지도 팝업 / 페이지 테이블 / 거리순 정렬 / "N km 이내" 필터가 모두 같은 값을 쓰게 한다.
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    # 하버사인 거리(km). 인자는 스칼라/배열 아무거나(브로드캐스팅), NaN 좌표는 NaN으로 나온다.
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    # 목적:
+    #  - 중심 반경 radius_km 원을 빠짐없이 감싸는 사각형 (남, 서, 북, 동) [도].
+    #  - 경도 폭은 asin(sin(r/R) / cos(위도))로 계산해야 고위도에서도 원이 잘리지 않는다.
+    ang = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(ang)
+    s, n = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    ratio = math.sin(ang) / max(math.cos(math.radians(lat)), 1e-12)
+    if ratio >= 1.0 or s <= -90.0 or n >= 90.0:
+        return s, -180.0, n, 180.0  # 극점을 포함하면 경도 전체
+    dlng = math.degrees(math.asin(ratio))
+    return s, max(lng - dlng, -180.0), n, min(lng + dlng, 180.0)
+
+
+def _coords(rows: List[Dict[str, Any]], key: str) -> np.ndarray:
+    # latitude/longitude 컬럼을 float 배열로 (None/문자열 깨짐은 NaN)
+    out = np.full(len(rows), np.nan)
+    for i, r in enumerate(rows):
+        try:
+            out[i] = float(r.get(key))
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+def with_distance(rows: List[Dict[str, Any]], user_lat: float, user_lng: float,
+                  max_km: Optional[float] = None, sort: bool = True) -> List[Dict[str, Any]]:
+    # 목적:
+    #  - rows 각 행에 distance_m을 붙인 복사본을 돌려준다.
+    #  - max_km를 주면 그 안의 지점만, sort=True면 가까운 순(좌표 없는 행은 맨 뒤).
+    if not rows or user_lat is None or user_lng is None:
+        return rows
+
+    dist_m = haversine_km(user_lat, user_lng, _coords(rows, "latitude"), _coords(rows, "longitude")) * 1000.0
+
+    idx = np.arange(len(rows))
+    if max_km is not None:
+        idx = idx[dist_m <= max_km * 1000.0]  # NaN은 비교가 False라 자동 제외
+    if sort:
+        idx = idx[np.argsort(dist_m[idx], kind="stable")]  # NaN은 argsort에서 맨 뒤
+
+    return [
+        dict(rows[i], distance_m=None if np.isnan(dist_m[i]) else float(dist_m[i]))
+        for i in idx
+    ]
+
+
+def format_distance(distance_m: Optional[float]) -> str:
+    # 화면 표시용 거리 문자열 (1km 미만은 m, 이상은 km 소수 1자리)
+    if distance_m is None:
+        return ""
+    if distance_m < 1000:
+        return f"{int(distance_m)}m"
+    return f"{distance_m / 1000:.1f}km"
@@ -0,0 +1,90 @@
+# File: geohash.py
+# 목적:
+#  - 지점 좌표를 geohash(base32 계층 셀 id)로 바꾼다. 앞 글자가 같을수록 같은 큰 셀 안에 있다.
+#  - 반경 검색 시 원을 덮는 셀 목록을 만들어서
+#    bluehands.geohash 인덱스에 prefix(LIKE 'wydm9%') / IN 조회로 후보를 먼저 좁힌다.
+#    (SPATIAL INDEX를 못 쓰는 MySQL에서도 일반 B-tree 인덱스만으로 근접 검색 가능)
+#  - 정확한 거리 판정은 후보를 받은 뒤 하버사인으로 한다.
+#
+# 정밀도(글자 수)별 셀 크기(적도 기준, 대략):
+#   4: 39km x 19.5km / 5: 4.9km x 4.9km / 6: 1.2km x 0.6km / 7: 153m x 153m / 9: 4.8m x 4.8m
+
+import math
+from typing import List
+import numpy as np
+
+from Function.geo import bounding_box
+
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # DB에 저장하는 길이 (bluehands.geohash CHAR(9))
+
+
+def _bits(precision: int):
+    # 정밀도 -> (위도 비트 수, 경도 비트 수). 경도부터 번갈아 쓰므로 경도가 같거나 1 많다.
+    total = precision * 5
+    return total // 2, (total + 1) // 2
+
+
+def cell_size_deg(precision: int):
+    # 정밀도 p 셀 1칸의 (위도 폭, 경도 폭) [도]
+    lat_bits, lng_bits = _bits(precision)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def encode_many(lats, lngs, precision: int = GEOHASH_PRECISION) -> List[str]:
+    # 목적:
+    #  - 위경도 배열을 한 번에 geohash 문자열 리스트로 바꾼다(importer 적재용).
+    #  - 각 축을 정수 격자 번호로 만든 뒤 비트를 경도/위도 순으로 교차(interleave)한다.
+    lat = np.asarray(lats, dtype=np.float64)
+    lng = np.asarray(lngs, dtype=np.float64)
+    lat_bits, lng_bits = _bits(precision)
+    lat_i = np.clip(np.floor((lat + 90.0) / 180.0 * (1 << lat_bits)), 0, (1 << lat_bits) - 1).astype(np.int64)
+    lng_i = np.clip(np.floor((lng + 180.0) / 360.0 * (1 << lng_bits)), 0, (1 << lng_bits) - 1).astype(np.int64)
+
+    code = np.zeros(lat.shape, dtype=np.int64)
+    li, gi = lat_bits, lng_bits
+    for bit in range(precision * 5):
+        if bit % 2 == 0:  # 짝수 번째 비트 = 경도
+            gi -= 1
+            code = (code << 1) | ((lng_i >> gi) & 1)
+        else:
+            li -= 1
+            code = (code << 1) | ((lat_i >> li) & 1)
+
+    out = []
+    for c in code.reshape(-1).tolist():
+        chars = []
+        for _ in range(precision):
+            chars.append(BASE32[c & 31])
+            c >>= 5
+        out.append("".join(reversed(chars)))
+    return out
+
+
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    return encode_many([lat], [lng], precision)[0]
+
+
+def covering_cells(lat: float, lng: float, radius_km: float, max_cells: int = 24) -> List[str]:
+    # 목적:
+    #  - 중심 (lat, lng) 반경 radius_km 원을 감싸는 사각형을 덮는 geohash 셀 목록.
+    #  - 셀 수가 max_cells 이하가 되는 가장 긴(작은 셀) 정밀도를 고른다.
+    #    -> 셀이 작을수록 후보가 적고, 셀 수가 적을수록 쿼리 조건이 짧다.
+    s, w, n, e = bounding_box(lat, lng, radius_km)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        h, wd = cell_size_deg(precision)
+        rows = math.floor((n + 90.0) / h) - math.floor((s + 90.0) / h) + 1
+        cols = math.floor((e + 180.0) / wd) - math.floor((w + 180.0) / wd) + 1
+        if rows * cols <= max_cells or precision == 1:
+            break
+
+    # 격자 셀 중심을 찍어서 인코딩 (셀 경계에 걸린 값이 옆 셀로 넘어가지 않게 중심 사용)
+    lat0 = (math.floor((s + 90.0) / h) + 0.5) * h - 90.0
+    lng0 = (math.floor((w + 180.0) / wd) + 0.5) * wd - 180.0
+    lats = [lat0 + i * h for i in range(rows)]
+    lngs = [lng0 + j * wd for j in range(cols)]
+    grid_lat = [la for la in lats for _ in lngs]
+    grid_lng = [lo for _ in lats for lo in lngs]
+    return sorted(set(encode_many(grid_lat, grid_lng, precision)))
@@ -0,0 +1,154 @@
+# File: nearest.py
+# 목적:
+#  - 지점 좌표 전체를 메모리에 올려두고 "내 위치에서 가까운 N개 / 반경 r km 이내"를
+#    DB 왕복 없이 바로 답한다.
+#  - 위경도를 단위 구(unit sphere) 위의 3차원 벡터로 바꿔 KD-tree에 넣는다.
+#    구 위의 직선거리(chord)는 대원거리와 단조 관계라서 가까운 순서가 그대로 유지된다.
+#  - scipy가 있으면 cKDTree, 없으면 numpy 전수 비교로 동작한다.
+#    (전국 지점이 수천 개 수준이라 전수 비교도 수 ms 안에 끝난다)
+#
+# 사용 예:
+#   index = NearestIndex(rows, flag_cols=["is_ev", "is_hydrogen"])
+#   index.knn(37.49, 127.02, k=10, flags=["is_ev"])        -> 가까운 순 10개
+#   index.within(37.49, 127.02, radius_km=5)              -> 5km 이내, 가까운 순
+
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+
+from Function.geo import EARTH_RADIUS_KM
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy 없으면 numpy 전수 비교
+    cKDTree = None
+
+
+def to_unit_xyz(lat, lng) -> np.ndarray:
+    # 위경도(도) -> 단위 구 위의 (x, y, z). 스칼라/배열 모두 받는다.
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lng = np.radians(np.asarray(lng, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)], axis=-1)
+
+
+def km_to_chord(km: float) -> float:
+    # 대원거리(km) -> 단위 구 위 직선거리
+    return 2.0 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2.0)
+
+
+def chord_to_km(chord) -> np.ndarray:
+    # 단위 구 위 직선거리 -> 대원거리(km)
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+class NearestIndex:
+    # 목적:
+    #  - rows(dict 리스트, latitude/longitude 필수)를 받아 k-최근접 / 반경 검색 인덱스를 만든다.
+    #  - 결과는 항상 거리순이고, 각 행에 distance_m(미터)을 붙인 복사본을 돌려준다.
+    #  - flags: 지정한 is_* 컬럼이 모두 1인 지점만 (AND 조건, 화면의 서비스 옵션과 같음)
+    #  - mask: 길이 n의 bool 배열로 추가 조건(지역/검색어 등)을 직접 넘길 수도 있다.
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], flag_cols: Iterable[str] = ()):
+        self.flag_cols = list(flag_cols)
+        self.rows: List[Dict[str, Any]] = []
+        lats, lngs = [], []
+        for r in rows:
+            try:
+                lat, lng = float(r["latitude"]), float(r["longitude"])
+            except (KeyError, TypeError, ValueError):
+                continue  # 좌표 없는 행은 거리 검색 대상이 아님
+            self.rows.append(r)
+            lats.append(lat)
+            lngs.append(lng)
+
+        self.n = len(self.rows)
+        self.xyz = to_unit_xyz(lats, lngs).reshape(-1, 3)
+        # 플래그는 (n, 플래그 수) bool 행렬로 들고 있다가 마스크 계산에 쓴다
+        self.flags = np.array(
+            [[r.get(c) in (1, True, "1") for c in self.flag_cols] for r in self.rows],
+            dtype=bool,
+        ).reshape(self.n, len(self.flag_cols))
+        self.tree = cKDTree(self.xyz) if (cKDTree is not None and self.n) else None
+
+    def __len__(self):
+        return self.n
+
+    # -------------------------------------------------------------------------
+    # 마스크
+    # -------------------------------------------------------------------------
+    def flag_mask(self, flags: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        # 지정한 플래그가 모두 1인 행만 True (flags가 비었으면 None = 조건 없음)
+        cols = [self.flag_cols.index(c) for c in (flags or []) if c in self.flag_cols]
+        if not cols:
+            return None
+        return self.flags[:, cols].all(axis=1)
+
+    def _combine(self, flags, mask) -> Optional[np.ndarray]:
+        fm = self.flag_mask(flags)
+        if mask is None:
+            return fm
+        mask = np.asarray(mask, dtype=bool)
+        return mask if fm is None else (mask & fm)
+
+    # -------------------------------------------------------------------------
+    # 검색
+    # -------------------------------------------------------------------------
+    def _result(self, idx: np.ndarray, chord: np.ndarray) -> List[Dict[str, Any]]:
+        dist_m = chord_to_km(chord) * 1000.0
+        return [dict(self.rows[i], distance_m=float(d)) for i, d in zip(idx, dist_m)]
+
+    def knn(self, lat: float, lng: float, k: int = 10,
+            flags: Optional[Iterable[str]] = None, radius_km: Optional[float] = None,
+            mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        # 가까운 순 k개 (radius_km를 주면 그 안에서만)
+        if not self.n or k <= 0:
+            return []
+        q = to_unit_xyz(lat, lng)
+        keep = self._combine(flags, mask)
+        upper = km_to_chord(radius_km) if radius_km else np.inf
+
+        if self.tree is None:
+            d = np.linalg.norm(self.xyz - q, axis=1)
+            ok = d <= upper
+            if keep is not None:
+                ok &= keep
+            cand = np.flatnonzero(ok)
+            if len(cand) > k:
+                cand = cand[np.argpartition(d[cand], k - 1)[:k]]
+            cand = cand[np.argsort(d[cand], kind="stable")]
+            return self._result(cand, d[cand])
+
+        # KD-tree: 마스크가 있으면 k를 2배씩 늘려가며 조건 맞는 k개가 찰 때까지 조회
+        kk = k
+        while True:
+            kk = min(kk, self.n)
+            d, idx = self.tree.query(q, k=kk, distance_upper_bound=upper)
+            d, idx = np.atleast_1d(d), np.atleast_1d(idx)
+            found = idx < self.n  # 반경 밖이면 idx == n, d == inf
+            d, idx = d[found], idx[found]
+            if keep is not None:
+                sel = keep[idx]
+                d, idx = d[sel], idx[sel]
+            if len(idx) >= k or kk >= self.n or found.sum() < kk:
+                return self._result(idx[:k], d[:k])
+            kk *= 2
+
+    def within(self, lat: float, lng: float, radius_km: float,
+               flags: Optional[Iterable[str]] = None,
+               mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        # 반경 radius_km 이내 전부, 가까운 순
+        if not self.n:
+            return []
+        q = to_unit_xyz(lat, lng)
+        upper = km_to_chord(radius_km)
+        if self.tree is None:
+            idx = np.flatnonzero(np.linalg.norm(self.xyz - q, axis=1) <= upper)
+        else:
+            idx = np.asarray(self.tree.query_ball_point(q, upper), dtype=np.int64)
+
+        keep = self._combine(flags, mask)
+        if keep is not None:
+            idx = idx[keep[idx]]
+        d = np.linalg.norm(self.xyz[idx] - q, axis=1)
+        order = np.argsort(d, kind="stable")
+        return self._result(idx[order], d[order])
@@ -0,0 +1,127 @@
+# File: query_key.py
+# 목적:
+#  - 검색 조건(검색어, 서비스 옵션, 지역)을 정규화한 QueryKey 하나로 만든다.
+#    캐시 로더는 원래 인자 대신 이 키를 받으므로, 뜻이 같은 조회는 같은 캐시 항목을 쓴다.
+#      - 검색어: NFC(한글 자모 분리 방지) + 소문자 + 앞뒤 공백 제거 + 연속 공백 1칸
+#      - 서비스 옵션: 중복 제거 + 비트 순서(Function/flags.py FLAG_COLS)로 정렬
+#      - 지역: "(전체)" / 빈 값 -> None
+#  - 캐시 적중률(hit rate)과 "원래 인자로는 몇 가지였는지 / 정규화 후 몇 가지인지"를 집계한다.
+#    집계는 검색 진입점(search_bluehands / search_nearest 등)에서 QUERY_STATS.track()으로 한 번만 한다.
+#
+# 사용 예:
+#   key = make_query_key("  강남   현대 ", ["is_frame", "is_ev", "is_ev"], "(전체)")
+#   -> QueryKey(search_text="강남 현대", flags=("is_ev", "is_frame"), region=None)
+#   key = QUERY_STATS.track("search", text, flags, region)   # 키 생성 + 요청/키 집계
+
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from Function.flags import FLAG_BITS, FLAG_COLS
+
+
+ALL_REGIONS = "(전체)"  # 화면의 지역 선택 "전체" 값 (조건 없음)
+
+_WS_RE = re.compile(r"\s+")
+
+
+class QueryKey(NamedTuple):
+    # 정규화된 검색 조건. tuple이라 hash / pickle 결과가 항상 같다(st.cache_data 키로 안전).
+    search_text: str = ""
+    flags: Tuple[str, ...] = ()
+    region: Optional[str] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.search_text or self.flags or self.region)
+
+
+def normalize_text(value: Any) -> str:
+    if value is None:
+        return ""
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", str(value))).strip().lower()
+
+
+def normalize_flags(flags: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    # 모르는 컬럼명은 버리고, 같은 옵션 조합이면 순서와 상관없이 같은 tuple
+    seen = {f for f in (flags or []) if f in FLAG_BITS}
+    return tuple(col for col in FLAG_COLS if col in seen)
+
+
+def normalize_region(region: Any) -> Optional[str]:
+    if region is None:
+        return None
+    region = _WS_RE.sub(" ", unicodedata.normalize("NFC", str(region))).strip()
+    return None if not region or region == ALL_REGIONS else region
+
+
+def make_query_key(search_text: Any = "", flags: Optional[Iterable[str]] = None,
+                   region: Any = None) -> QueryKey:
+    # 집계 없이 키만 만든다 (화면에서 조건 유무 판단 등에 여러 번 불러도 된다)
+    return QueryKey(normalize_text(search_text), normalize_flags(flags), normalize_region(region))
+
+
+class QueryStats:
+    # 목적:
+    #  - 이름(name)별로 requests: 호출 수 / hits: 캐시(스냅샷)로 답한 수 / misses: 실제로 DB까지 간 수
+    #    hit_rate = 1 - misses / requests
+    #  - raw_keys / canonical_keys: 정규화 전/후 서로 다른 키 수 (정규화로 캐시 항목이 얼마나 합쳐졌는지)
+    #    키 집합은 max_keys개까지만 기억한다(메모리 상한).
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._raw = set()
+        self._canonical = set()
+        self.counts = Counter()
+
+    def record_key(self, raw: Tuple, key: QueryKey):
+        try:
+            hash(raw)
+        except TypeError:
+            raw = repr(raw)
+        with self._lock:
+            if len(self._raw) < self.max_keys:
+                self._raw.add(raw)
+            if len(self._canonical) < self.max_keys:
+                self._canonical.add(key)
+
+    def track(self, name: str, search_text: Any = "", flags: Optional[Iterable[str]] = None,
+              region: Any = None) -> QueryKey:
+        # 검색 진입점용: 키 생성 + 원래/정규화 키 기록 + 요청 1회 집계
+        key = make_query_key(search_text, flags, region)
+        self.record_key((search_text, tuple(flags or ()), region), key)
+        self.request(name)
+        return key
+
+    def request(self, name: str = "query"):
+        with self._lock:
+            self.counts[f"{name}.requests"] += 1
+
+    def hit(self, name: str = "query"):
+        with self._lock:
+            self.counts[f"{name}.hits"] += 1
+
+    def miss(self, name: str = "query"):
+        with self._lock:
+            self.counts[f"{name}.misses"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {"raw_keys": len(self._raw), "canonical_keys": len(self._canonical)}
+            names = {k.rsplit(".", 1)[0] for k in self.counts}
+            for name in sorted(names):
+                requests = self.counts[f"{name}.requests"]
+                misses = self.counts[f"{name}.misses"]
+                out[name] = {
+                    "requests": requests,
+                    "hits": self.counts[f"{name}.hits"],
+                    "misses": misses,
+                    "hit_rate": (1.0 - misses / requests) if requests else None,
+                }
+        return out
+
+
+QUERY_STATS = QueryStats()
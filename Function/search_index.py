@@ -0,0 +1,106 @@
+# File: search_index.py
+# 목적:
+#  - 지점명/주소/지역명 검색을 MySQL 없이 메모리에서 바로 답하는 역색인(inverted index).
+#  - 각 지점 텍스트를 글자 2-gram(bigram)으로 쪼개서 "bigram -> 지점 번호 정렬 배열(posting)"을 만든다.
+#  - 검색어 단어마다 bigram posting을 교집합 -> 후보를 만든 뒤 실제 부분 문자열 포함 여부로 확정한다.
+#    단어끼리는 AND (예: "강남 현대" -> 두 단어가 모두 들어있는 지점)
+#  - 1글자 단어는 unigram posting으로 처리한다.
+#
+# 사용 예:
+#   index = BigramIndex.from_rows(rows, fields=("name", "address", "region_name"))
+#   index.search_ids("강남 현대")   -> 매칭된 지점 id 배열
+#   index.mask("강남")              -> rows 순서의 bool 배열 (다른 조건과 & 하기 좋게)
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence
+import numpy as np
+
+
+FIELD_SEP = "\x1f"  # 필드 경계. 이 문자가 낀 n-gram은 만들지 않는다(필드를 넘는 오매칭 방지)
+
+
+def normalize_text(x) -> str:
+    # 비교용 정규화: NFC(한글 자모 분리 방지) + 소문자 + 연속 공백 1칸
+    s = unicodedata.normalize("NFC", "" if x is None else str(x)).lower()
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def split_tokens(search_text: str) -> List[str]:
+    return [t for t in normalize_text(search_text).split(" ") if t]
+
+
+def _grams(text: str, n: int) -> set:
+    return {text[i:i + n] for i in range(len(text) - n + 1) if FIELD_SEP not in text[i:i + n]}
+
+
+class BigramIndex:
+    # 목적:
+    #  - docs[i] = i번째 지점의 검색 대상 문자열들(지점명, 주소, 지역명 ...)
+    #  - ids[i] = 그 지점의 id (search_ids가 돌려줄 값)
+
+    def __init__(self, docs: Iterable[Sequence[Any]], ids: Sequence[Any] = None):
+        self.texts: List[str] = [FIELD_SEP.join(normalize_text(f) for f in doc) for doc in docs]
+        self.n = len(self.texts)
+        self.ids = np.asarray(ids if ids is not None else range(self.n))
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, text in enumerate(self.texts):
+            # i가 증가하는 순서로 append 하므로 posting은 자동으로 정렬 상태
+            for g in _grams(text, 1) | _grams(text, 2):
+                postings[g].append(i)
+        self.postings: Dict[str, np.ndarray] = {g: np.asarray(p, dtype=np.int32) for g, p in postings.items()}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], fields: Sequence[str] = ("name", "address"),
+                  id_field: str = "id") -> "BigramIndex":
+        rows = list(rows)
+        return cls(([r.get(f) for f in fields] for r in rows), ids=[r.get(id_field) for r in rows])
+
+    def __len__(self):
+        return self.n
+
+    def _token_candidates(self, token: str) -> np.ndarray:
+        # 단어 1개 -> 그 단어를 포함하는 지점 번호(정렬 배열)
+        grams = [token] if len(token) == 1 else sorted(_grams(token, 2))
+        lists = [self.postings.get(g) for g in grams]
+        if any(p is None for p in lists):
+            return np.empty(0, dtype=np.int32)
+
+        # 짧은 posting부터 교집합 -> 중간 결과가 빨리 작아진다
+        lists.sort(key=len)
+        cand = lists[0]
+        for p in lists[1:]:
+            if not len(cand):
+                break
+            cand = np.intersect1d(cand, p, assume_unique=True)
+
+        # bigram이 다 있어도 순서/연속성까지 맞는지는 실제 문자열로 확인
+        if len(token) > 2:
+            cand = cand[[token in self.texts[i] for i in cand]] if len(cand) else cand
+        return cand
+
+    def search(self, search_text: str) -> np.ndarray:
+        # 목적:
+        #  - 검색어의 모든 단어를 포함하는 지점 번호(rows 순서 기준, 오름차순)
+        #  - 검색어가 비었으면 전체
+        tokens = split_tokens(search_text)
+        if not tokens:
+            return np.arange(self.n, dtype=np.int32)
+
+        result = None
+        for tok in sorted(set(tokens), key=len, reverse=True):  # 긴 단어가 후보를 더 빨리 줄인다
+            cand = self._token_candidates(tok)
+            result = cand if result is None else np.intersect1d(result, cand, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def search_ids(self, search_text: str) -> np.ndarray:
+        return self.ids[self.search(search_text)]
+
+    def mask(self, search_text: str) -> np.ndarray:
+        out = np.zeros(self.n, dtype=bool)
+        out[self.search(search_text)] = True
+        return out
@@ -1,27 +1,44 @@
 import streamlit as st
-import mysql.connector
 import pandas as pd
-import re
+import os
+import sys
 
-st.title("📊 시/도 → 구/군 필터링 (주소 기반)")
+# 저장소 루트의 Function/ 공용 모듈을 쓰기 위해 경로 추가 (streamlit run Function/selectbox.py 로 실행해도 동작)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Function.db import get_conn, get_data_version  # 공용 MySQL 커넥션 풀 / 데이터 버전
+from Function.search_index import BigramIndex  # 메모리 bigram 역색인(지점명/주소/지역명 검색)
 
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="mysql",
-    database="bluehands_db",
-    charset="utf8mb4"
-)
+st.title("📊 시/도 → 구/군 필터링 (주소 기반)")
 
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "mysql",
+    "database": "bluehands_db",
+    "charset": "utf8mb4"
+}
+
+# 쿼리마다 공용 커넥션 풀에서 연결을 빌리고 끝나면 바로 반납
+# (rerun / st.stop / 쿼리 에러로 스크립트가 중간에 끝나도 연결이 풀로 돌아가도록 finally에서 close)
+def read_sql(sql, params=None):
+    conn = get_conn(DB_CONFIG)
+    try:
+        return pd.read_sql(sql, conn, params=params)
+    finally:
+        conn.close()
+
+# 조회 결과 기본 조건: 주소가 있는 지점 (시/도를 못 찾은 지점도 "(전체)" 조회/검색에는 나와야 함)
 base_where = "a.address IS NOT NULL AND a.address <> ''"
 
 # 시/도 목록
-sido_df = pd.read_sql(f"""                                          -- SUBSTRING_INDEX(a.address, ' ', 1)
-    SELECT DISTINCT TRIM(SUBSTRING_INDEX(a.address, ' ', 1)) AS sido     -- 문자열을 공백 기준으로 잘라서 앞에서 1개 가져오기   
-      FROM bluehands a                                                   -- TRIM: 앞 뒤 공백 제거
-     WHERE {base_where}  -- WHERE a.address IS NOT NULL AND a.address <> ''
-     ORDER BY sido       -- 주소가 아예 없는 데이터 제외,  주소가 빈 문자열("")인 데이터 제외
-""", conn)
+# sido / gugun / dong 컬럼은 importer가 주소를 미리 파싱해서 넣어둔 값 (Function/address.py)
+# (sido, gugun, dong) 복합 인덱스만 읽으면 되므로 테이블 전체를 훑지 않음
+sido_df = read_sql("""
+    SELECT DISTINCT a.sido AS sido
+      FROM bluehands a
+     WHERE a.sido IS NOT NULL  -- 주소에서 시/도를 못 찾은 지점은 목록에서만 제외
+     ORDER BY sido
+""")
 sido_options = ["(전체)"] + sido_df["sido"].dropna().tolist() # .dropna: 혹시라도 값이 없는 행(NaN)이 있으면 제거
                                                              # .tolist(): 리스트로 변환
 # ✅ 초기값, setdefault:해당 키가 없을 때만 값을 넣어라
@@ -29,6 +46,18 @@ st.session_state.setdefault("search_text", "")               # "" 저장 / 이
 st.session_state.setdefault("selected_sido", "(전체)")        # "(전체)" / 저장 사용자가 선택한 값 유지
 st.session_state.setdefault("selected_gugun", "(전체)")       # "(전체)" / 저장 사용자가 선택한 값 유지
 
+# ✅ 검색용 메모리 역색인 (한 번 만들어서 모든 세션이 공유, 데이터 버전이 바뀔 때(재적재 직후)만 새로 만듦)
+# 지점명 / 주소 / 지역명을 글자 2개씩(bigram) 쪼개서 "bigram -> 지점 번호 목록"으로 저장
+@st.cache_resource(max_entries=1)
+def load_search_index(data_version):
+    # 연결은 이 함수 안에서 빌리고 반납 (다른 세션의 연결을 쓰지 않도록)
+    df = read_sql("""
+        SELECT a.id, a.name, a.address, r.name AS region_name
+          FROM bluehands a
+          JOIN regions r ON a.region_id = r.id
+    """)
+    return BigramIndex.from_rows(df.to_dict("records"), fields=("name", "address", "region_name"))
+
 # 버튼 클릭시 돌어거는 함수,  78번 줄
 def reset_filters():
     st.session_state["search_text"] = ""
@@ -55,15 +84,13 @@ with col1:
 if selected_sido == "(전체)":
     gugun_options = ["(전체)"]
 else:
-    gugun_df = pd.read_sql(f"""
-        SELECT DISTINCT TRIM(SUBSTRING_INDEX(SUBSTRING_INDEX(a.address, ' ', 2), ' ', -1)) AS gugun 
-        -- 주소에서 두번째 단어 추출(ex. 인천광역시 동구에서 동구)
-        
+    gugun_df = read_sql(f"""
+        SELECT DISTINCT a.gugun AS gugun   -- 구/군 (ex. 인천광역시 동구에서 동구)
           FROM bluehands a
-         WHERE {base_where}
-           AND TRIM(SUBSTRING_INDEX(a.address, ' ', 1)) = %s
+         WHERE a.sido = %s                 -- 복합 인덱스 앞자리(sido)로 바로 찾음
+           AND a.gugun IS NOT NULL
          ORDER BY gugun
-    """, conn, params=(selected_sido,))
+    """, params=(selected_sido,))
     gugun_options = ["(전체)"] + gugun_df["gugun"].dropna().tolist()
 
     if st.session_state.get("selected_gugun") not in gugun_options:
@@ -98,9 +125,9 @@ params = []
 # 사용자가 "(전체)"가 아닌 특정 시/도를 선택했을 때만 조건 추가
 if selected_sido != "(전체)":
 
-    # 주소의 "첫 번째 단어" = 시/도
-    # 예: "서울특별시 강남구 테헤란로" → 서울특별시
-    where_clauses.append("TRIM(SUBSTRING_INDEX(a.address, ' ', 1)) = %s")
+    # 시/도 컬럼 (주소의 "첫 번째 단어"를 표준 이름으로 저장해 둔 값)
+    # 예: "서울 강남구 테헤란로" → 서울특별시
+    where_clauses.append("a.sido = %s")
 
     # 위의 %s 자리에 들어갈 실제 값
     params.append(selected_sido)
@@ -111,12 +138,10 @@ if selected_sido != "(전체)":
     # 구/군도 "(전체)"가 아닐 때만 조건 추가
     if selected_gugun != "(전체)":
 
-        # 주소의 "두 번째 단어" = 구/군
-        # SUBSTRING_INDEX(a.address, ' ', 2) → "서울특별시 강남구"
-        # 다시 거기서 뒤에서 한 단어(-1) → "강남구"
-        where_clauses.append(
-            "TRIM(SUBSTRING_INDEX(SUBSTRING_INDEX(a.address, ' ', 2), ' ', -1)) = %s"
-        )
+        # 구/군 컬럼 (주소의 "두 번째 단어")
+        # 예: "서울특별시 강남구 테헤란로" → 강남구
+        # (sido, gugun) 둘 다 인덱스 앞자리라서 인덱스 범위 조회로 끝남
+        where_clauses.append("a.gugun = %s")
 
         # 두 번째 %s에 들어갈 값
         params.append(selected_gugun)
@@ -128,48 +153,36 @@ if selected_sido != "(전체)":
 #
 # 예시 결과:
 # WHERE a.address IS NOT NULL AND a.address <> ''
-#   AND TRIM(SUBSTRING_INDEX(a.address, ' ', 1)) = %s
-#   AND TRIM(SUBSTRING_INDEX(SUBSTRING_INDEX(a.address, ' ', 2), ' ', -1)) = %s
+#   AND a.sido = %s
+#   AND a.gugun = %s
 #
 # params = ['서울특별시', '강남구']
 # ---------------------------
 
 
-# ✅ 다단어 AND 검색 (LIKE)
+# ✅ 다단어 AND 검색 (메모리 bigram 역색인)
 # 예: 사용자가 "강남 현대" 입력하면
 # → ["강남", "현대"] 두 단어로 나눔
+# 각 단어는 지점명/주소/지역명 중 하나에라도 포함되어야 하고, 단어들 사이 관계는 AND
+# 검색 자체는 MySQL을 거치지 않고 메모리 역색인에서 끝남 → 매칭된 지점 id만 SQL로 넘김
 if search_text:
 
-    # 공백 기준으로 단어 분리
-    # r"\s+" = 스페이스 여러 개도 하나로 처리
-    tokens = [t for t in re.split(r"\s+", search_text) if t]
+    # 역색인에서 모든 단어를 포함하는 지점 id 찾기 (수십 μs)
+    matched_ids = [int(x) for x in load_search_index(get_data_version(DB_CONFIG)).search_ids(search_text)]
 
-    # 각 단어(tok)가
-    # 지점명(a.name) OR 주소(a.address) OR 지역명(r.name)
-    # 중 하나에라도 포함되어야 함
-    # 그리고 단어들 사이 관계는 AND
-    for tok in tokens:
-
-        where_clauses.append("""
-            (
-                a.name LIKE %s OR
-                a.address LIKE %s OR
-                r.name LIKE %s
-            )
-        """)
-
-        # LIKE 검색용 와일드카드
-        # "%강남%" → 앞뒤에 뭐가 있어도 포함되면 OK
-        kw = f"%{tok}%"
-
-        # 위에 %s 3개에 들어갈 실제 값들
-        params.extend([kw, kw, kw])
+    if matched_ids:
+        # 기본키(id) IN 조회라서 LIKE처럼 테이블 전체를 훑지 않음
+        where_clauses.append("a.id IN (" + ", ".join(["%s"] * len(matched_ids)) + ")")
+        params.extend(matched_ids)
+    else:
+        # 하나도 없으면 결과 0건
+        where_clauses.append("1 = 0")
 
 
 # 지금까지 모은 조건들을 AND로 연결해서
 # 최종 WHERE 절 문자열 완성
 # 예:
-# "a.address IS NOT NULL ... AND a.name LIKE %s AND ..."
+# "a.address IS NOT NULL AND a.address <> '' AND a.sido = %s AND a.id IN (%s, %s, ...)"
 where_sql = " AND ".join(where_clauses)
 
 
@@ -187,11 +200,7 @@ query = f"""
 
 # SQL 실행 + 결과를 판다스 DataFrame으로 가져오기
 # params 리스트의 값들이 %s 자리에 순서대로 안전하게 들어감
-result_df = pd.read_sql(query, conn, params=params)
-
-result_df = pd.read_sql(query, conn, params=params)
+result_df = read_sql(query, params=params)
 
 st.subheader("조회 결과")
 st.dataframe(result_df, use_container_width=True)
-
-conn.close()
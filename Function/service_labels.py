@@ -3,6 +3,8 @@
 #  - bluehands 테이블에서 지점 id로 1행을 조회한다.
 #  - is_* 플래그(0/1, True/False, "1"/"0", "Y"/"N" 등)를 판정해
 #    값이 1인 항목만 한글 라벨 리스트/문자열로 변환한다.
+#  - 여러 지점은 *_by_ids 함수로 한 번에 조회한다. (WHERE id IN (...) 쿼리 1번)
+#    조회한 (지점명, service_mask)는 id 기준 LRU 캐시에 두고, data_version이 바뀌면 비운다.
 #
 # 환경변수(없으면 기본값):
 #  - DB_HOST (default: localhost)
@@ -10,65 +12,30 @@
 #  - DB_USER (default: root)
 #  - DB_PASSWORD (default: )
 #  - DB_NAME (default: bluehands_db)
+#  - LABEL_CACHE_SIZE (default: 4096, 캐시에 둘 지점 수)
 
-from typing import Any, Dict, List, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
 import os
-import mysql.connector
+import sys
+import threading
+import numpy as np
 
+# 저장소 루트의 Function/ 공용 모듈을 쓰기 위해 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Function.db import get_conn as pooled_conn, get_data_version
+from Function.flags import (
+    FLAG_LABELS,
+    is_truthy_flag as _is_truthy_flag,
+    labels_for_mask,
+    mask_from_row,
+)
 
-# 플래그 컬럼명 -> 사용자 표시 라벨(한글)
-# - dict 선언 순서가 곧 표시 순서다(Python 3.7+).
-FLAG_LABELS: Dict[str, str] = {
-    # 1) 친환경차 관련
-    "is_ev": "전기차 수리",
-    "is_ev_tech": "전동차 기술력 우수",
-    "is_hydrogen": "수소전기차 수리",
-
-    # 2) 차체/도장 및 특수 수리
-    "is_frame": "차체/도장 수리 인증",
-    "is_al_frame": "알루미늄 프레임 수리",
-    "is_n_line": "고성능 N 모델 수리",
-
-    # 3) 상용차(특화/버스) 관련
-    "is_commercial_mid": "중형 상용 수리",
-    "is_commercial_big": "대형 상용 수리",
-    "is_commercial_ev": "상용 전동차 수리",
-
-    # 4) CS 우수
-    "is_cs_excellent": "CS 우수",
 
-    # 스키마에 is_excellent도 있지만 의미가 애매하면 표시하지 않는 편이 안전하다.
-    # 필요하면 아래 주석 해제하고 라벨 확정해서 쓰면 된다.
-    # "is_excellent": "우수 업체",
-}
-
-
-def _is_truthy_flag(value: Any) -> bool:
-    """
-    목적:
-      - DB/CSV 값 타입이 섞여도 "참(1)"인지 판정한다.
-    허용 예:
-      - 1 / 0
-      - True / False
-      - "1" / "0"
-      - "Y" / "N"
-      - "true" / "false"
-    """
-    if value is None:
-        return False
-
-    # bool이 int의 서브클래스이므로 먼저 처리
-    if isinstance(value, bool):
-        return value
-
-    if isinstance(value, (int, float)):
-        return value == 1
-
-    if isinstance(value, str):
-        s = value.strip().lower()
-        return s in ("1", "y", "yes", "true", "t")
-
-    return False
+# 플래그 컬럼명 -> 사용자 표시 라벨(한글) 은 Function/flags.py 레지스트리에 있다.
+# - dict 선언 순서가 곧 표시 순서다(Python 3.7+).
+# - 스키마에 is_excellent도 있지만 의미가 애매해서 표시하지 않는다.
+# - _is_truthy_flag: DB/CSV 값 타입이 섞여도(1 / True / "1" / "Y" / "true") 참인지 판정
 
 
 def labels_from_row(row: Dict[str, Any]) -> List[str]:
@@ -78,11 +45,23 @@ def labels_from_row(row: Dict[str, Any]) -> List[str]:
     출력:
       - 값이 1인 플래그에 해당하는 한글 라벨 리스트
     """
-    labels: List[str] = []
-    for flag_key, label in FLAG_LABELS.items():
-        if _is_truthy_flag(row.get(flag_key)):
-            labels.append(label)
-    return labels
+    # 플래그 -> service_mask(비트) -> 미리 계산된 라벨 튜플 조회 (행마다 플래그 10개를 돌지 않음)
+    return list(labels_for_mask(mask_from_row(row)))
+
+
+def labels_from_rows(rows: Iterable[Dict[str, Any]]) -> List[List[str]]:
+    """
+    목적:
+      - labels_from_row의 여러 행 버전. 행마다가 아니라 서로 다른 mask마다 한 번만 라벨을 만든다.
+    출력:
+      - rows 순서대로 라벨 리스트의 리스트
+    """
+    masks = np.fromiter((mask_from_row(r) for r in rows), dtype=np.int64)
+    if not len(masks):
+        return []
+    uniq, inverse = np.unique(masks, return_inverse=True)
+    table = [list(labels_for_mask(int(m))) for m in uniq]
+    return [list(table[i]) for i in inverse]
 
 
 def format_labels(labels: List[str], sep: str = " · ") -> str:
@@ -95,24 +74,26 @@ def format_labels(labels: List[str], sep: str = " · ") -> str:
     return sep.join(labels)
 
 
-def _connect_db():
+def _db_config() -> Dict[str, Any]:
     """
     목적:
-      - 환경변수로 DB 접속 정보를 읽어 MySQL 연결을 만든다.
+      - 환경변수로 DB 접속 정보를 읽는다.
     """
-    host = os.getenv("DB_HOST", "localhost")
-    port = int(os.getenv("DB_PORT", "3306"))
-    user = os.getenv("DB_USER", "root")
-    password = os.getenv("DB_PASSWORD", "")
-    database = os.getenv("DB_NAME", "bluehands_db")
+    return {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": int(os.getenv("DB_PORT", "3306")),
+        "user": os.getenv("DB_USER", "root"),
+        "password": os.getenv("DB_PASSWORD", ""),
+        "database": os.getenv("DB_NAME", "bluehands_db"),
+    }
 
-    return mysql.connector.connect(
-        host=host,
-        port=port,
-        user=user,
-        password=password,
-        database=database,
-    )
+
+def _connect_db():
+    """
+    목적:
+      - 공용 커넥션 풀에서 MySQL 연결을 빌린다. (conn.close() 하면 풀로 반납)
+    """
+    return pooled_conn(_db_config())
 
 
 def fetch_branch_row_by_id(branch_id: int) -> Dict[str, Any]:
@@ -122,8 +103,7 @@ def fetch_branch_row_by_id(branch_id: int) -> Dict[str, Any]:
     반환:
       - row dict (없으면 빈 dict)
     """
-    flag_cols = list(FLAG_LABELS.keys())
-    cols = ["id", "name"] + flag_cols
+    cols = ["id", "name", "service_mask"]
     col_sql = ", ".join(cols)
 
     conn = _connect_db()
@@ -139,6 +119,123 @@ def fetch_branch_row_by_id(branch_id: int) -> Dict[str, Any]:
         conn.close()
 
 
+class _BranchCache:
+    # 목적:
+    #  - id -> (지점명, service_mask) 를 담는 크기 제한 LRU (라벨은 mask로 바로 계산되므로 mask만 둔다)
+    #  - version이 다른 값으로 조회되면 통째로 비운다. (재적재 후 예전 값이 남지 않게)
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.version: Optional[Hashable] = None
+        self._data: "OrderedDict[int, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, ids: List[int], version: Optional[Hashable]) -> Tuple[Dict[int, Tuple[str, int]], List[int]]:
+        # 반환: (캐시에 있던 것, 없어서 DB에서 읽어야 하는 id 목록)
+        hits, misses = {}, []
+        with self._lock:
+            if version != self.version:
+                self._data.clear()
+                self.version = version
+            for i in ids:
+                entry = self._data.get(i)
+                if entry is None:
+                    misses.append(i)
+                else:
+                    self._data.move_to_end(i)
+                    hits[i] = entry
+        return hits, misses
+
+    def put_many(self, entries: Dict[int, Tuple[str, int]], version: Optional[Hashable]):
+        with self._lock:
+            if version != self.version:  # 조회 중에 버전이 바뀌었으면 예전 결과는 넣지 않는다
+                return
+            self._data.update(entries)
+            for i in entries:
+                self._data.move_to_end(i)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_branch_cache = _BranchCache(int(os.getenv("LABEL_CACHE_SIZE", "4096")))
+
+
+def clear_label_cache():
+    _branch_cache.clear()
+
+
+def fetch_branch_rows_by_ids(branch_ids: Iterable[int], data_version: Optional[Hashable] = None,
+                             batch_size: int = 1000) -> Dict[int, Dict[str, Any]]:
+    """
+    목적:
+      - 여러 id의 (id, name, service_mask)를 한 번에 가져온다.
+      - 캐시에 없는 id만 WHERE id IN (...) 로 조회한다. (batch_size개씩, 커넥션은 1개)
+      - data_version: 데이터 버전(재적재마다 바뀌는 값). 이전 호출과 다르면 캐시를 비우고 다시 읽는다.
+                      생략하면 meta.data_version을 조회해서 쓴다.
+    반환:
+      - {id: row dict} (DB에 없는 id는 빠진다)
+    """
+    if data_version is None:
+        data_version = get_data_version(_db_config())
+    ids = list(dict.fromkeys(int(i) for i in branch_ids))  # 중복 제거(순서 유지)
+    cached, misses = _branch_cache.get_many(ids, data_version)
+
+    if misses:
+        found: Dict[int, Tuple[str, int]] = {}
+        conn = _connect_db()
+        try:
+            cur = conn.cursor(dictionary=True)
+            try:
+                for start in range(0, len(misses), batch_size):
+                    batch = misses[start:start + batch_size]
+                    cur.execute(
+                        f"SELECT id, name, service_mask FROM bluehands "
+                        f"WHERE id IN ({', '.join(['%s'] * len(batch))})",
+                        batch,
+                    )
+                    for r in cur.fetchall():
+                        found[int(r["id"])] = (str(r.get("name") or ""), int(r.get("service_mask") or 0))
+            finally:
+                cur.close()
+        finally:
+            conn.close()
+        _branch_cache.put_many(found, data_version)
+        cached.update(found)
+
+    return {
+        i: {"id": i, "name": cached[i][0], "service_mask": cached[i][1]}
+        for i in ids if i in cached
+    }
+
+
+def get_service_labels_by_ids(branch_ids: Iterable[int], data_version: Optional[Hashable] = None) -> Dict[int, List[str]]:
+    """
+    목적:
+      - 지점 id 여러 개 -> {id: 서비스 라벨 리스트} (쿼리 1번)
+    예:
+      - {12: ["전기차 수리"], 40: []}
+    """
+    rows = fetch_branch_rows_by_ids(branch_ids, data_version=data_version)
+    return dict(zip(rows.keys(), labels_from_rows(rows.values())))
+
+
+def get_branch_names_and_services_by_ids(branch_ids: Iterable[int], sep: str = " · ",
+                                         data_version: Optional[Hashable] = None) -> Dict[int, Tuple[str, List[str], str]]:
+    """
+    목적:
+      - 지점 id 여러 개 -> {id: (지점명, 라벨리스트, 합친문자열)} (쿼리 1번)
+    """
+    rows = fetch_branch_rows_by_ids(branch_ids, data_version=data_version)
+    return {
+        i: (row["name"], labels, format_labels(labels, sep=sep))
+        for (i, row), labels in zip(rows.items(), labels_from_rows(rows.values()))
+    }
+
+
 def get_service_labels_by_id(branch_id: int) -> List[str]:
     """
     목적:
@@ -0,0 +1,105 @@
+# File: singleflight.py
+# 목적:
+#  - 같은 조회가 동시에 여러 번 들어오면 DB에는 한 번만 보내고 결과를 나눠 준다(single-flight).
+#    예) 캐시가 비어 있는 재시작 직후, 여러 세션이 동시에 같은 버전의 전 지점 스냅샷을 만들려는 경우
+#  - 먼저 온 호출(leader)만 실제로 실행하고, 같은 키로 그동안 들어온 호출(follower)은 끝나기를 기다렸다가
+#    같은 결과(또는 같은 예외)를 받는다. 끝난 뒤에 오는 호출은 다시 실행한다(결과를 저장하지 않음 = 캐시 아님).
+#  - 동시 계산 잠금이 없는 캐시(SWRCache 등)의 로더에만 붙인다. 캐시 miss가 동시에 몰릴 때만 효과가 있다.
+#    st.cache_data / st.cache_resource는 같은 키 계산을 이미 한 번으로 묶으므로(키별 잠금) 겹쳐 쓰지 않는다.
+#
+# 주의:
+#  - Streamlit은 세션마다 스크립트를 다시 실행하므로 함수가 매번 새로 정의된다.
+#    그래서 그룹은 모듈 전역 1개(_default_group)를 쓰고, 키에 함수 이름(module.qualname)을 넣는다.
+#
+# 사용 예:
+#   @single_flight
+#   def build_snapshot(data_version): ...
+#   snap = SWRCache().get("snapshot", data_version, build_snapshot)
+
+import threading
+from collections import Counter
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def freeze(value: Any) -> Hashable:
+    # 인자를 dict 키로 쓸 수 있게 (list -> tuple, set -> 정렬 tuple, dict -> 정렬 (k, v) tuple)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(freeze(v) for v in value))
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    return value
+
+
+class SingleFlight:
+    # 목적:
+    #  - do(key, fn, ...): key가 같은 진행 중 호출이 있으면 그 결과를 기다리고, 없으면 fn을 실행한다.
+    #  - stats: executed(실제 실행) / shared(기다렸다가 결과를 나눠 받은 호출) 횟수
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = Counter()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self.stats["executed" if leader else "shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_default_group = SingleFlight()
+
+
+def single_flight(fn: Callable[..., Any] = None, *, group: Optional[SingleFlight] = None):
+    # 데코레이터: 함수 이름 + 인자(freeze)를 키로 single-flight
+    def decorate(f):
+        name = f"{f.__module__}.{f.__qualname__}"
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = (name, freeze(args), freeze(kwargs))
+            return (group or _default_group).do(key, f, *args, **kwargs)
+
+        return wrapper
+
+    return decorate(fn) if fn is not None else decorate
+
+
+def stats() -> Dict[str, int]:
+    # 기본 그룹의 누적 지표
+    return dict(_default_group.stats)
@@ -0,0 +1,163 @@
+# File: snapshot.py
+# 목적:
+#  - bluehands 전체(전국 수천 행)를 한 번 읽어 컬럼 단위(columnar) 배열로 메모리에 올린다.
+#  - 지역 / 서비스 옵션 / 검색어 조건을 DB 왕복 없이 bool 마스크 연산으로 바로 답한다.
+#    (조건 조합마다 쿼리 1번 + 조합마다 따로 캐시 -> 스냅샷 1개로 모든 조합 처리)
+#  - 가까운 순 검색(NearestIndex)과 검색어 역색인(BigramIndex)도 같은 행 순서로 같이 들고 있다.
+#
+# 컬럼:
+#  - id / type_id: int 배열, latitude / longitude: float64 배열, service_mask: uint16 배열
+#  - region: 지역명 카테고리(regions) + 행별 코드(region_codes)  -> 지역 필터는 정수 비교 1번
+#  - name / address / phone: intern 된 문자열 object 배열
+#
+# 사용 예:
+#   snap = Snapshot.from_rows(rows)
+#   snap.query("강남 현대", ["is_ev"], "서울")        -> 조건에 맞는 행 dict 리스트
+#   snap.mask(None, ["is_ev"], None)                 -> rows 순서 bool 배열 (NearestIndex에 넘기기 좋게)
+
+import sys
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+import numpy as np
+
+from Function.flags import FLAG_COLS, mask_from_cols, mask_from_row
+from Function.nearest import NearestIndex
+from Function.search_index import BigramIndex, split_tokens, normalize_text
+
+
+ALL_REGIONS = "(전체)"  # 화면의 지역 선택 "전체" 값 (조건 없음)
+# 검색어를 찾는 컬럼: SQL 대체 경로(Function/fulltext.py search_condition)와 같은 지점명/주소만.
+# (지역명까지 찾으면 스냅샷이 답할 때와 DB로 대체될 때 결과가 달라진다)
+SEARCH_FIELDS = ("name", "address")
+
+
+def _intern(values: Iterable[Any]) -> np.ndarray:
+    # 같은 문자열은 객체 하나만 두도록 intern (지역명/주소 반복이 많아 메모리가 준다)
+    return np.array([sys.intern(str(v)) if v is not None else None for v in values], dtype=object)
+
+
+class Snapshot:
+    # 목적:
+    #  - rows(dict 리스트, latitude/longitude 필수)를 컬럼 배열로 바꿔 들고 있는다.
+    #  - version: 만들 때의 데이터 버전 (바뀌면 호출부에서 새로 만든다)
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], version: Optional[Hashable] = None):
+        self.version = version
+        rows = [r for r in rows if r.get("latitude") is not None and r.get("longitude") is not None]
+        self.n = len(rows)
+
+        self.ids = np.array([int(r["id"]) for r in rows], dtype=np.int64)
+        self.type_ids = np.array([int(r.get("type_id") or 0) for r in rows], dtype=np.int32)
+        self.latitude = np.array([float(r["latitude"]) for r in rows], dtype=np.float64)
+        self.longitude = np.array([float(r["longitude"]) for r in rows], dtype=np.float64)
+        self.service_mask = np.array([mask_from_row(r) for r in rows], dtype=np.uint16)
+
+        self.name = _intern(r.get("name") for r in rows)
+        self.address = _intern(r.get("address") for r in rows)
+        self.phone = _intern(r.get("phone") for r in rows)
+
+        # 지역명은 카테고리 + 코드로 (-1 = 지역 없음)
+        region_names = [r.get("region_name") for r in rows]
+        self.regions: List[str] = sorted({sys.intern(str(v)) for v in region_names if v is not None})
+        code_of = {name: i for i, name in enumerate(self.regions)}
+        self.region_codes = np.array(
+            [code_of.get(str(v), -1) if v is not None else -1 for v in region_names], dtype=np.int32
+        )
+
+        # 검색어 역색인 / 최근접 인덱스 (행 순서가 스냅샷과 같아서 마스크를 그대로 넘긴다)
+        columns = [getattr(self, field) for field in SEARCH_FIELDS]
+        docs = ([col[i] for col in columns] for i in range(self.n))
+        self.text = BigramIndex(docs, ids=self.ids)
+        self.nearest = NearestIndex(self._rows_at(range(self.n)))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], version: Optional[Hashable] = None) -> "Snapshot":
+        return cls(rows, version=version)
+
+    def __len__(self):
+        return self.n
+
+    # -------------------------------------------------------------------------
+    # 행 꺼내기
+    # -------------------------------------------------------------------------
+    def _region_name(self, i: int) -> Optional[str]:
+        code = self.region_codes[i]
+        return self.regions[code] if code >= 0 else None
+
+    def _rows_at(self, idx: Iterable[int]) -> List[Dict[str, Any]]:
+        # 화면/지도 코드가 쓰는 dict 행 형태로 (기존 SQL 결과와 같은 키 + region_name)
+        out = []
+        for i in idx:
+            mask = int(self.service_mask[i])
+            row = {
+                "id": int(self.ids[i]),
+                "type_id": int(self.type_ids[i]),
+                "name": self.name[i],
+                "latitude": float(self.latitude[i]),
+                "longitude": float(self.longitude[i]),
+                "address": self.address[i],
+                "phone": self.phone[i],
+                "region_name": self._region_name(i),
+                "service_mask": mask,
+            }
+            for bit, col in enumerate(FLAG_COLS):
+                row[col] = (mask >> bit) & 1
+            out.append(row)
+        return out
+
+    # -------------------------------------------------------------------------
+    # 마스크
+    # -------------------------------------------------------------------------
+    def region_mask(self, region: Optional[str]) -> Optional[np.ndarray]:
+        if not region or region == ALL_REGIONS:
+            return None
+        try:
+            return self.region_codes == self.regions.index(region)
+        except ValueError:  # 스냅샷에 없는 지역
+            return np.zeros(self.n, dtype=bool)
+
+    def flag_mask(self, flags: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        m = mask_from_cols(flags)
+        if not m:
+            return None
+        return (self.service_mask & m) == m
+
+    def text_mask(self, search_text: Optional[str]) -> Optional[np.ndarray]:
+        if not split_tokens(search_text or ""):
+            return None
+        return self.text.mask(search_text)
+
+    def mask(self, search_text: Optional[str], flags: Optional[Iterable[str]],
+             region: Optional[str]) -> Optional[np.ndarray]:
+        # 세 조건 AND. 조건이 하나도 없으면 None (= 전체)
+        out = None
+        for m in (self.region_mask(region), self.flag_mask(flags), self.text_mask(search_text)):
+            if m is not None:
+                out = m if out is None else (out & m)
+        return out
+
+    # -------------------------------------------------------------------------
+    # 조회
+    # -------------------------------------------------------------------------
+    def _relevance_order(self, idx: np.ndarray, search_text: str) -> np.ndarray:
+        # 검색어 정렬: 지점명에 들어있는 단어 수가 많은 순 (같으면 id 순서 유지)
+        tokens = split_tokens(search_text)
+        score = np.array(
+            [sum(t in normalize_text(self.name[i]) for t in tokens) for i in idx], dtype=np.int32
+        )
+        return idx[np.argsort(-score, kind="stable")]
+
+    def query(self, search_text: Optional[str], flags: Optional[Iterable[str]],
+              region: Optional[str]) -> List[Dict[str, Any]]:
+        # 조건에 맞는 행 전부 (검색어가 있으면 관련도 순, 없으면 id 순)
+        keep = self.mask(search_text, flags, region)
+        idx = np.arange(self.n) if keep is None else np.flatnonzero(keep)
+        if search_text and len(idx):
+            idx = self._relevance_order(idx, search_text)
+        return self._rows_at(idx)
+
+    def nearest_rows(self, lat: float, lng: float, search_text: Optional[str],
+                     flags: Optional[Iterable[str]], region: Optional[str],
+                     limit: int = 10, radius_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        # 조건에 맞는 행 중 가까운 순 limit개 (distance_m 포함)
+        return self.nearest.knn(lat, lng, k=limit, radius_km=radius_km,
+                                mask=self.mask(search_text, flags, region))
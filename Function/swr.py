@@ -0,0 +1,139 @@
+# File: swr.py
+# 목적:
+#  - stale-while-revalidate 캐시.
+#    데이터 버전이 바뀌어 캐시 값이 낡았을 때, 다음 사용자가 DB 조회/스냅샷 재생성을 기다리지 않도록
+#    낡은 값을 바로 돌려주고 새 값은 백그라운드 스레드에서 만든다.
+#  - 낡은 값을 계속 줄 수 있는 시간은 max_staleness초로 제한한다.
+#    (새 버전을 처음 본 뒤 그 시간이 지나도록 갱신이 안 끝났으면 그때는 직접 기다려서 새로 만든다)
+#  - 갱신 소요시간(refresh latency)과 fresh / stale / 동기 조회 횟수를 기록한다.
+#
+# 사용 예:
+#   cache = SWRCache(max_staleness=60)
+#   snap = cache.get("snapshot", current_version, build_snapshot)   # build_snapshot(version) -> 값
+#   cache.metrics()  -> {"fresh": .., "stale": .., "refresh_p50_ms": .., "refresh_p99_ms": .., ...}
+#
+# 환경변수(없으면 기본값):
+#  - SWR_MAX_STALENESS (default: 60초)
+
+import os
+import time
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Hashable, Optional
+import numpy as np
+
+
+SWR_MAX_STALENESS = float(os.getenv("SWR_MAX_STALENESS", "60"))
+
+
+class _Entry:
+    __slots__ = ("value", "version", "loaded_at", "stale_since", "refreshing")
+
+    def __init__(self, value: Any, version: Hashable):
+        self.value = value
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.stale_since: Optional[float] = None  # 더 새 버전을 처음 본 시각
+        self.refreshing = False
+
+
+class SWRCache:
+    # 목적:
+    #  - key -> (값, 그 값을 만든 버전)
+    #  - get(key, version, loader): 버전이 같으면 fresh, 다르면 stale 값을 주고 백그라운드 갱신
+
+    def __init__(self, max_staleness: float = SWR_MAX_STALENESS, latency_window: int = 256):
+        self.max_staleness = max_staleness
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._lock = threading.Lock()
+        self.stats = Counter()
+        self._latency_ms = deque(maxlen=latency_window)  # 최근 갱신 소요시간(ms)
+
+    # -------------------------------------------------------------------------
+    # 조회
+    # -------------------------------------------------------------------------
+    def get(self, key: Hashable, version: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self.stats["fresh"] += 1
+                return entry.value
+
+            if entry is not None:
+                if entry.stale_since is None:
+                    entry.stale_since = now
+                if now - entry.stale_since <= self.max_staleness:
+                    self.stats["stale"] += 1
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        threading.Thread(
+                            target=self._refresh, args=(key, version, loader),
+                            name=f"swr-refresh-{key}", daemon=True,
+                        ).start()
+                    return entry.value
+                self.stats["stale_expired"] += 1  # 너무 오래 낡음 -> 아래에서 직접 기다림
+
+            # 처음이거나 max_staleness를 넘긴 경우: 호출한 쪽이 기다려서 만든다 (실패는 그대로 올림)
+            self.stats["sync"] += 1
+        value = self._timed_load(loader, version)
+        self._store(key, version, value)
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        # 버전과 상관없이 지금 들고 있는 값 (없으면 None)
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    # -------------------------------------------------------------------------
+    # 갱신
+    # -------------------------------------------------------------------------
+    def _timed_load(self, loader: Callable[[Hashable], Any], version: Hashable) -> Any:
+        started = time.perf_counter()
+        value = loader(version)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            self._latency_ms.append(elapsed_ms)
+        return value
+
+    def _store(self, key: Hashable, version: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = _Entry(value, version)
+
+    def _refresh(self, key: Hashable, version: Hashable, loader: Callable[[Hashable], Any]):
+        try:
+            value = self._timed_load(loader, version)
+        except Exception:
+            # 실패하면 낡은 값을 그대로 두고, 다음 get에서 다시 시도한다
+            with self._lock:
+                self.stats["refresh_errors"] += 1
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+            return
+        with self._lock:
+            self.stats["refreshes"] += 1
+            self._entries[key] = _Entry(value, version)
+
+    # -------------------------------------------------------------------------
+    # 지표
+    # -------------------------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = np.asarray(self._latency_ms, dtype=np.float64)
+            out: Dict[str, Any] = dict(self.stats)
+        out["refresh_count"] = int(len(lat))
+        if len(lat):
+            out["refresh_last_ms"] = float(lat[-1])
+            out["refresh_p50_ms"] = float(np.percentile(lat, 50))
+            out["refresh_p99_ms"] = float(np.percentile(lat, 99))
+            out["refresh_max_ms"] = float(lat.max())
+        return out
@@ -1,14 +1,23 @@
 import os  # 운영체제(OS)와 상호작용하기 위한 라이브러리 (환경변수 값을 읽어올 때 사용)
 import math  # 기본적인 수학 계산을 위한 파이썬 내장 라이브러리
+from functools import lru_cache  # 서비스 뱃지 HTML 캐시(mask별)
 import streamlit as st  # 웹 애플리케이션 UI 프레임워크
 import mysql.connector  # MySQL 연결/쿼리 실행
 import folium  # 지도 생성/마커 표시
 from folium.plugins import LocateControl  # 현재 위치 버튼
 from streamlit_folium import st_folium  # Streamlit에 Folium 지도 렌더링
 import streamlit.components.v1 as components  # HTML/JS 실행
-from math import radians, cos, sin, asin, sqrt  # 거리 계산(하버사인)
 from streamlit_js_eval import get_geolocation  # 브라우저 GPS API 호출
 from dotenv import load_dotenv  # .env 로드
+from Function.swr import SWRCache  # 스냅샷 stale-while-revalidate 캐시
+from Function.singleflight import single_flight, stats as single_flight_stats  # 같은 조회 동시 요청은 DB에 한 번만
+from Function.query_key import make_query_key, QUERY_STATS  # 검색 조건 정규화(캐시 키) + 적중률 집계
+from Function.snapshot import Snapshot  # 전 지점 컬럼 스냅샷(마스크 필터 + KD-tree + bigram 역색인)
+from Function.geo import with_distance, format_distance, bounding_box  # 결과 전체 거리 일괄 계산(하버사인)
+from Function.geohash import covering_cells, GEOHASH_PRECISION  # 셀 기반 반경 검색(SPATIAL INDEX 대체)
+from Function.fulltext import search_condition  # 지점명/주소 FULLTEXT(ngram) 검색 조건
+from Function.db import get_conn as pooled_conn, get_data_version  # 공용 MySQL 커넥션 풀 / 데이터 버전
+from Function.flags import FILTER_OPTIONS, FILTER_OPTION_ITEMS, labels_for_mask, mask_from_row, mask_condition  # 서비스 플래그 레지스트리
 
 # .env 파일에서 환경 변수(DB 접속 정보 등)를 로드합니다.
 load_dotenv()
@@ -223,14 +232,9 @@ st.markdown(
 )
 
 # 필터 옵션
-FILTER_OPTIONS = {
-    "is_ev": "⚡ 전기차 전담",
-    "is_hydrogen": "💧 수소차 전담",
-    "is_frame": "🔨 판금/차체 수리",
-    "is_cs_excellent": "🏆 우수 협력점",
-    "is_n_line": "🏎️ N-Line 전담",
-}
-FLAG_COLS_SQL = ", ".join(FILTER_OPTIONS.keys())
+# FILTER_OPTIONS(컬럼 -> 화면 라벨)는 Function/flags.py 레지스트리에서 가져온다.
+# service_mask: 플래그 비트마스크 (필터/뱃지 렌더링용)
+FLAG_COLS_SQL = ", ".join(FILTER_OPTIONS.keys()) + ", service_mask"
 
 # 범례 HTML (흰 배경에 올릴 거라 다크모드 대응 불필요)
 LEGEND_HTML = """
@@ -279,45 +283,45 @@ if "last_click_key" not in st.session_state:
 # 2. 헬퍼 함수
 # -----------------------------------------------------------------------------
 def get_conn():
-    return mysql.connector.connect(**DB_CONFIG)
+    # 공용 커넥션 풀에서 빌림 (conn.close() 하면 풀로 반납)
+    return pooled_conn(DB_CONFIG)
 
-def haversine(lon1, lat1, lon2, lat2):
-    if any(x is None for x in [lon1, lat1, lon2, lat2]):
-        return None
-    R = 6371
-    lon1, lat1, lon2, lat2 = map(radians, [float(lon1), float(lat1), float(lon2), float(lat2)])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-    c = 2 * asin(sqrt(a))
-    return c * R
+def current_data_version():
+    # 현재 데이터 버전(meta.data_version). 캐시 로더가 캐시 키로 쓴다.
+    return get_data_version(DB_CONFIG)
 
 def scroll_down():
     js = """<script>setTimeout(function(){window.parent.scrollTo({top: 500, behavior:'smooth'});}, 300);</script>"""
     components.html(js, height=0)
 
-def _service_text_from_row(row: dict) -> str:
-    labels = [label for col, label in FILTER_OPTIONS.items() if row.get(col) == 1]
+# 뱃지 HTML은 service_mask 값(최대 2^10가지)별로 한 번만 만들고 재사용
+@lru_cache(maxsize=None)
+def _service_badges_html(mask: int) -> str:
     return "".join(
         [
             f'<span class="badge" style="display:inline-block; background:#eff6ff; color:#1e40af; '
             f'padding:2px 8px; border-radius:9999px; font-size:11px; font-weight:600; margin:2px; '
             f'border:1px solid #dbeafe;">{l}</span>'
-            for l in labels
+            for l in labels_for_mask(mask, FILTER_OPTION_ITEMS)
         ]
     )
 
-def format_services_html(row):
-    badges = ""
-    for col, label in FILTER_OPTIONS.items():
-        if row.get(col) == 1:
-            badges += (
-                f'<span style="background:#f0f7ff; color:#0054a6; padding:3px 6px; border-radius:4px; '
-                f'font-size:11px; margin-right:4px; border:1px solid #cce4ff; font-weight:600;">{label}</span>'
-            )
+@lru_cache(maxsize=None)
+def _popup_badges_html(mask: int) -> str:
+    badges = "".join(
+        f'<span style="background:#f0f7ff; color:#0054a6; padding:3px 6px; border-radius:4px; '
+        f'font-size:11px; margin-right:4px; border:1px solid #cce4ff; font-weight:600;">{label}</span>'
+        for label in labels_for_mask(mask, FILTER_OPTION_ITEMS)
+    )
     return f'<div style="margin-top:8px; line-height:1.6;">{badges}</div>' if badges else ""
 
-def add_markers_to_map(m, rows, user_lat=None, user_lng=None):
+def _service_text_from_row(row: dict) -> str:
+    return _service_badges_html(mask_from_row(row))
+
+def format_services_html(row):
+    return _popup_badges_html(mask_from_row(row))
+
+def add_markers_to_map(m, rows):
     fg = folium.FeatureGroup(name="검색 결과")
     type_color_map = {1: "green", 2: "blue", 3: "red"}
 
@@ -338,11 +342,11 @@ def add_markers_to_map(m, rows, user_lat=None, user_lng=None):
         except Exception:
             type_id = None
 
+        # 거리는 with_distance가 미리 붙여둔 distance_m 사용 (위치 권한 없으면 없음)
         dist_str = "⚠️ 권한 필요"
-        if user_lat is not None and user_lng is not None:
-            d = haversine(user_lng, user_lat, lng, lat)
-            if d is not None:
-                dist_str = f"🚶 {int(d * 1000)}m" if d < 1 else f"내 위치로부터 🚗 {d:.1f}km"
+        d = row.get("distance_m")
+        if d is not None:
+            dist_str = f"🚶 {format_distance(d)}" if d < 1000 else f"내 위치로부터 🚗 {format_distance(d)}"
 
         services_html = format_services_html(row)
         pin_color = type_color_map.get(type_id, "gray")
@@ -393,6 +397,8 @@ def build_hy_table_html(rows_page: list[dict]) -> str:
       .c-addr { width:40%; text-align:left; line-height:1.4; word-break: keep-all; }
       .c-phone { width:10%; text-align:center; color:#0054a6; font-weight:600; }
       .c-svc { width:35%; text-align:center; }
+      .c-dist { width:8%; text-align:center; color:#e11d48; font-weight:700; }
+      table.hy.has-dist .c-addr { width:32%; }
 
       .muted { color:#9ca3af; font-size:13px; text-align:center; display:block; }
     </style>
@@ -401,6 +407,9 @@ def build_hy_table_html(rows_page: list[dict]) -> str:
     def s(x):
         return "" if x is None else str(x)
 
+    # 위치 권한이 있으면(distance_m 있음) 거리 컬럼 추가
+    has_dist = any(r.get("distance_m") is not None for r in rows_page)
+
     trs = ""
     for r in rows_page:
         name = s(r.get("name"))
@@ -416,20 +425,24 @@ def build_hy_table_html(rows_page: list[dict]) -> str:
             f'<td class="c-addr">{addr}</td>'
             f'<td class="c-phone">{phone}</td>'
             f'<td class="c-svc">{svc_html}</td>'
-            f"</tr>"
+            + (f'<td class="c-dist">{format_distance(r.get("distance_m"))}</td>' if has_dist else "")
+            + f"</tr>"
         )
 
     if not trs:
         trs = '<tr><td colspan="4" style="text-align:center;padding:20px;">검색 결과가 없습니다.</td></tr>'
 
+    dist_th = "<th>거리</th>" if has_dist else ""
+
     html = f"""{css}
-<table class="hy">
+<table class="hy{' has-dist' if has_dist else ''}">
   <thead>
     <tr>
       <th>지점명</th>
       <th>주소</th>
       <th>전화번호</th>
       <th>서비스 옵션</th>
+      {dist_th}
     </tr>
   </thead>
   <tbody>{trs}</tbody>
@@ -517,39 +530,53 @@ def render_paginated_table(rows_all: list[dict]):
 # -----------------------------------------------------------------------------
 # 4. DB 조회
 # -----------------------------------------------------------------------------
-@st.cache_data(ttl=3600)
-def get_regions():
+@st.cache_data(max_entries=2)
+def _fetch_regions(data_version):
+    # data_version: 캐시 키 (재적재로 버전이 바뀔 때만 다시 읽는다). 실패는 캐시되지 않도록 예외를 올린다.
     conn = None
     try:
         conn = get_conn()
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM bluehands_db.regions ORDER BY id")
         return [row[0] for row in cursor.fetchall()]
-    except Exception:
-        return []
     finally:
         if conn:
             conn.close()
 
-@st.cache_data(ttl=600)
-def get_bluehands_data(search_text, selected_filters, region_filter):
+def get_regions():
+    try:
+        return _fetch_regions(current_data_version())
+    except Exception:
+        return []
+
+@st.cache_data(max_entries=256)
+def _fetch_bluehands_data(query_key, data_version):
+    # query_key: 정규화된 검색 조건(QueryKey), data_version: 캐시 키 (재적재로 버전이 바뀔 때만 다시 읽는다).
+    # 실패는 캐시되지 않도록 예외를 올린다.
+    QUERY_STATS.miss("bluehands")
+    search_text, selected_filters, region_filter = query_key
     conn = None
     try:
         conn = get_conn()
         cursor = conn.cursor(dictionary=True)
+        # 검색어는 FULLTEXT(ngram) 인덱스로 찾고, MATCH 점수(relevance) 높은 순으로 정렬
+        search_sql, search_params, score_sql, score_params = search_condition(search_text)
         query = (
-            f"SELECT a.id, a.type_id, a.name, a.latitude, a.longitude, a.address, a.phone, {FLAG_COLS_SQL} "
+            f"SELECT a.id, a.type_id, a.name, a.latitude, a.longitude, a.address, a.phone, {FLAG_COLS_SQL}, "
+            f"{score_sql} AS relevance "
             f"FROM bluehands a LEFT JOIN regions b ON a.region_id = b.id"
         )
-        conditions, params = [], []
+        conditions, params = [], list(score_params)
 
-        if search_text:
-            conditions.append("(a.name LIKE %s OR a.address LIKE %s)")
-            params.extend([f"%{search_text}%", f"%{search_text}%"])
+        if search_sql:
+            conditions.append(search_sql)
+            params.extend(search_params)
 
-        if selected_filters:
-            for col in selected_filters:
-                conditions.append(f"a.{col} = 1")
+        # 서비스 옵션(AND)은 비트마스크 조건 하나로: (a.service_mask & m) = m
+        mask_sql, mask_params = mask_condition(selected_filters)
+        if mask_sql:
+            conditions.append(mask_sql)
+            params.extend(mask_params)
 
         if region_filter and region_filter != "(전체)":
             conditions.append("b.name = %s")
@@ -557,17 +584,192 @@ def get_bluehands_data(search_text, selected_filters, region_filter):
 
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        if search_sql:
+            query += " ORDER BY relevance DESC"
 
         cursor.execute(query, params)
         return cursor.fetchall()
+    finally:
+        if conn:
+            conn.close()
 
+def get_bluehands_data(query_key):
+    QUERY_STATS.request("bluehands")
+    try:
+        return _fetch_bluehands_data(query_key, current_data_version())
     except Exception as e:
         st.error(f"DB Error: {e}")
         return []
+
+NEAREST_START_KM = 5        # 반경 없이 "가까운 N개"를 찾을 때 처음 훑는 반경
+NEAREST_MAX_KM = 640        # 국내 전체를 덮는 최대 반경
+
+def _mbr_wkt(lat, lng, radius_km):
+    # 목적:
+    #  - (lat, lng) 중심 반경 radius_km 원을 감싸는 사각형(MBR)을 WKT POLYGON으로 만든다.
+    #  - 좌표는 경도 위도 순서(axis-order=long-lat로 넘긴다)
+    s, w, n, e = bounding_box(lat, lng, radius_km)
+    return f"POLYGON(({w} {s}, {e} {s}, {e} {n}, {w} {n}, {w} {s}))"
+
+NEAREST_COLS_SQL = (
+    f"a.id, a.type_id, a.name, a.latitude, a.longitude, a.address, a.phone, {FLAG_COLS_SQL}"
+)
+
+# DB 근접 검색 방식: spatial(SPATIAL INDEX, 실패 시 geohash로 대체) / geohash(B-tree 셀 prefix만 사용)
+NEAREST_BACKEND = os.getenv("NEAREST_BACKEND", "spatial")
+
+def _nearest_spatial(cursor, lat, lng, where_sql, params, limit, radius_km):
+    # MBRContains(사각형, location)로 SPATIAL INDEX를 타고, ST_Distance_Sphere(m)로 정렬/LIMIT
+    cursor.execute(
+        f"SELECT {NEAREST_COLS_SQL}, "
+        f"ST_Distance_Sphere(a.location, ST_SRID(POINT(%s, %s), 4326)) AS distance_m "
+        f"FROM bluehands a LEFT JOIN regions b ON a.region_id = b.id "
+        f"WHERE MBRContains(ST_GeomFromText(%s, 4326, 'axis-order=long-lat'), a.location){where_sql} "
+        f"HAVING distance_m <= %s ORDER BY distance_m LIMIT %s",
+        [lng, lat, _mbr_wkt(lat, lng, radius_km)] + params + [radius_km * 1000, limit],
+    )
+    return cursor.fetchall()
+
+def _nearest_geohash(cursor, lat, lng, where_sql, params, limit, radius_km):
+    # 원을 덮는 geohash 셀로 idx_bluehands_geohash만 타서 후보를 받고,
+    # 정확한 거리 판정/정렬은 하버사인(with_distance)으로 한다.
+    cells = covering_cells(lat, lng, radius_km)
+    if len(cells[0]) == GEOHASH_PRECISION:
+        cell_sql = "a.geohash IN (" + ", ".join(["%s"] * len(cells)) + ")"
+        cell_params = cells
+    else:
+        cell_sql = "(" + " OR ".join(["a.geohash LIKE %s"] * len(cells)) + ")"
+        cell_params = [c + "%" for c in cells]
+    cursor.execute(
+        f"SELECT {NEAREST_COLS_SQL} "
+        f"FROM bluehands a LEFT JOIN regions b ON a.region_id = b.id "
+        f"WHERE {cell_sql}{where_sql}",
+        cell_params + params,
+    )
+    return with_distance(cursor.fetchall(), lat, lng, max_km=radius_km)[:limit]
+
+@st.cache_data(max_entries=1024)
+def _fetch_nearest_bluehands(lat, lng, query_key, limit, radius_km, data_version):
+    # 목적:
+    #  - 내 위치 기준 가까운 지점 N개(또는 반경 radius_km 이내)를 DB에서 거리순으로 받는다.
+    #  - query_key: 정규화된 검색 조건(QueryKey)
+    #  - data_version: 캐시 키 (재적재로 버전이 바뀔 때만 다시 읽는다). 실패는 캐시되지 않도록 예외를 올린다.
+    #  - 기본은 SPATIAL INDEX 경로, 공간 함수를 못 쓰는 서버면 geohash 셀 경로로 대체한다.
+    #  - 반경이 없으면 5km부터 2배씩 넓혀서 limit개가 찰 때까지 다시 조회한다.
+    QUERY_STATS.miss("nearest")
+    search_text, selected_filters, region_filter = query_key
+    conn = None
+    try:
+        conn = get_conn()
+        cursor = conn.cursor(dictionary=True)
+
+        conditions, params = [], []
+        search_sql, search_params, _, _ = search_condition(search_text)
+        if search_sql:
+            conditions.append(search_sql)
+            params.extend(search_params)
+        mask_sql, mask_params = mask_condition(selected_filters)
+        if mask_sql:
+            conditions.append(mask_sql)
+            params.extend(mask_params)
+        if region_filter and region_filter != "(전체)":
+            conditions.append("b.name = %s")
+            params.append(region_filter)
+        where_sql = "".join(f" AND {c}" for c in conditions)
+
+        search = _nearest_geohash if NEAREST_BACKEND == "geohash" else _nearest_spatial
+        r = radius_km if radius_km else NEAREST_START_KM
+        while True:
+            try:
+                rows = search(cursor, lat, lng, where_sql, params, limit, r)
+            except mysql.connector.Error:
+                if search is _nearest_geohash:
+                    raise
+                search = _nearest_geohash  # SPATIAL INDEX / ST_Distance_Sphere 미지원 서버
+                continue
+            if radius_km or len(rows) >= limit or r >= NEAREST_MAX_KM:
+                return rows
+            r *= 2
+
     finally:
         if conn:
             conn.close()
 
+def get_nearest_bluehands(lat, lng, query_key, limit=10, radius_km=None):
+    QUERY_STATS.request("nearest")
+    try:
+        return _fetch_nearest_bluehands(lat, lng, query_key, limit, radius_km, current_data_version())
+    except Exception as e:
+        st.error(f"DB Error: {e}")
+        return []
+
+# SWRCache에는 동시 계산 잠금이 없어서(첫 요청 / max_staleness 초과 시 각 세션이 직접 만듦)
+# 같은 버전 스냅샷을 동시에 여러 번 만들지 않도록 single-flight로 묶는다.
+# (st.cache_data 로더는 키별 계산 잠금이 이미 있어서 single-flight를 붙이지 않는다)
+@single_flight
+def build_snapshot(data_version):
+    # 목적:
+    #  - bluehands 전체를 한 번 읽어 컬럼 배열 스냅샷(Snapshot)으로 메모리에 올린다.
+    #  - 지역/서비스 옵션/검색어 조건 조합과 가까운 순 검색을 전부 이 스냅샷 하나로 답한다.
+    #  - 캐시는 get_snapshot()의 SWRCache가 맡는다. 실패는 예외를 그대로 올린다(호출부에서 DB 쿼리로 대체).
+    conn = None
+    try:
+        conn = get_conn()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            f"SELECT a.id, a.type_id, a.name, a.latitude, a.longitude, a.address, a.phone, {FLAG_COLS_SQL}, "
+            f"b.name AS region_name "
+            f"FROM bluehands a LEFT JOIN regions b ON a.region_id = b.id ORDER BY a.id"
+        )
+        return Snapshot.from_rows(cursor.fetchall(), version=data_version)
+    finally:
+        if conn:
+            conn.close()
+
+@st.cache_resource
+def get_snapshot_cache():
+    # 스냅샷 캐시 (프로세스당 1개, 세션끼리 공유)
+    #  - data_version이 바뀌면 기존 스냅샷을 바로 주고 새 스냅샷은 백그라운드에서 만든다.
+    #  - SWR_MAX_STALENESS초가 지나도록 못 만들었으면 그때는 기다려서 만든다.
+    return SWRCache()
+
+def get_snapshot():
+    return get_snapshot_cache().get("snapshot", current_data_version(), build_snapshot)
+
+def _load_snapshot():
+    try:
+        snap = get_snapshot()
+    except Exception:
+        return None
+    return snap if len(snap) else None
+
+def search_bluehands(search_text, selected_filters, region_filter):
+    # 목적:
+    #  - 검색 결과를 메모리 스냅샷의 마스크 연산으로 바로 답한다(DB 왕복 없음).
+    #  - 스냅샷을 못 만들었으면(DB 장애 등) 기존 SQL 조회로 대체한다.
+    #  - 검색 진입점: 원래/정규화 키와 요청 수를 여기서 집계하고, 스냅샷으로 답했으면 hit / SQL로 갔으면 miss
+    query_key = QUERY_STATS.track("search", search_text, selected_filters, region_filter)
+    snap = _load_snapshot()
+    if snap is None:
+        QUERY_STATS.miss("search")
+        return get_bluehands_data(query_key)
+    QUERY_STATS.hit("search")
+    return snap.query(*query_key)
+
+def search_nearest(lat, lng, search_text, selected_filters, region_filter, limit=10, radius_km=None):
+    # 목적:
+    #  - "내 주변 가까운 순"을 스냅샷의 KD-tree로 바로 답한다(DB 왕복 없음).
+    #  - 지역/서비스 옵션/검색어 조건은 스냅샷 마스크로 걸러서 넘긴다.
+    #  - 스냅샷을 못 만들었으면 SPATIAL INDEX 쿼리로 대체한다.
+    #  - 검색 진입점: search_bluehands와 같은 방식으로 "search_nearest" 이름으로 집계
+    query_key = QUERY_STATS.track("search_nearest", search_text, selected_filters, region_filter)
+    snap = _load_snapshot()
+    if snap is None:
+        QUERY_STATS.miss("search_nearest")
+        return get_nearest_bluehands(lat, lng, query_key, limit, radius_km)
+    QUERY_STATS.hit("search_nearest")
+    return snap.nearest_rows(lat, lng, *query_key, limit=limit, radius_km=radius_km)
+
 def find_clicked_center_by_latlng(clicked_lat, clicked_lng, rows, tol=1e-6):
     """
     st_folium이 준 클릭좌표(clicked_lat/lng)를 rows(data_list) 안의 지점과 매칭.
@@ -644,6 +846,17 @@ with st.sidebar:
         if st.button("검색", type="primary", use_container_width=True):
             scroll_down()
 
+    # 내 위치 기준 거리 옵션 (위치 권한이 있을 때만)
+    #  - 반경: 일반 검색 결과에도 "N km 이내" 필터로 적용된다.
+    nearby_mode, nearby_limit, nearby_radius_km = False, 10, None
+    if user_lat is not None and user_lng is not None:
+        st.write("---")
+        radius_label = st.selectbox("📏 내 위치에서 거리", ["제한 없음", "1km", "3km", "5km", "10km", "20km"], key="nearby_radius")
+        nearby_radius_km = None if radius_label == "제한 없음" else float(radius_label[:-2])
+        nearby_mode = st.toggle("📍 내 주변 가까운 순으로 보기", key="nearby_mode")
+        if nearby_mode:
+            nearby_limit = st.slider("가져올 지점 수", 5, 50, 10, step=5, key="nearby_limit")
+
     top5_placeholder = st.empty()
 
     def render_top5(ph):
@@ -668,10 +881,26 @@ with st.sidebar:
     # 첫 렌더 (클릭 처리 전 상태)
     render_top5(top5_placeholder)
 
-should_search = search_query or selected_service_cols or (selected_region != "(전체)")
+# 검색 조건은 정규화한 QueryKey 하나로 (공백/대소문자/옵션 순서가 달라도 같은 조회 = 같은 캐시 항목)
+# 여기서는 조건 유무만 보고, 요청/키 집계는 search_bluehands / search_nearest 진입점에서 한다
+query_key = make_query_key(search_query, selected_service_cols, selected_region)
+should_search = not query_key.is_empty or nearby_mode
 
 if should_search:
-    data_list = get_bluehands_data(search_query, selected_service_cols, selected_region)
+    if nearby_mode:
+        # 스냅샷 KD-tree로 가까운 순 검색 (스냅샷이 없으면 DB SPATIAL INDEX 쿼리)
+        data_list = search_nearest(
+            user_lat, user_lng, search_query, selected_service_cols, selected_region,
+            limit=nearby_limit, radius_km=nearby_radius_km,
+        )
+    else:
+        # 메모리 스냅샷 마스크 필터 (스냅샷이 없으면 DB 쿼리)
+        data_list = search_bluehands(search_query, selected_service_cols, selected_region)
+        # 위치가 있으면 전체 결과 거리를 한 번에 계산 -> 가까운 순 정렬 + 반경 필터
+        #  (지도 팝업/테이블 모두 같은 distance_m 사용)
+        #  검색어가 있으면 정확도(relevance) 순서를 유지하고 거리는 표시/필터에만 쓴다.
+        if user_lat is not None and user_lng is not None:
+            data_list = with_distance(data_list, user_lat, user_lng, max_km=nearby_radius_km, sort=not query_key.search_text)
 
     if not data_list:
         st.error("조건에 맞는 검색 결과가 없습니다.")
@@ -697,7 +926,7 @@ if should_search:
         ).add_to(m)
 
     if data_list:
-        add_markers_to_map(m, data_list, user_lat, user_lng)
+        add_markers_to_map(m, data_list)
 
         # Streamlit에 지도 렌더링
         map_out = st_folium(m, height=500, use_container_width=True)
@@ -744,6 +973,14 @@ else:
     m = folium.Map(location=[37.4979, 127.0276], zoom_start=13)
     st_folium(m, height=450, use_container_width=True)
 
+# 캐시 지표 (SHOW_CACHE_STATS=1 일 때만): 검색 캐시 적중률 / 정규화 전후 키 수 / 스냅샷 갱신 / single-flight
+if os.getenv("SHOW_CACHE_STATS") == "1":
+    with st.sidebar.expander("📈 캐시 지표"):
+        st.json({
+            "query": QUERY_STATS.report(),
+            "snapshot": get_snapshot_cache().metrics(),
+            "single_flight": single_flight_stats(),
+        })
 
 # FAQ HTML/CSS (resource)
 st.markdown("---")
@@ -1,5 +1,6 @@
 import os
 import math
+from functools import lru_cache
 import streamlit as st
 import mysql.connector
 import pandas as pd
@@ -11,6 +12,13 @@ from math import radians, cos, sin, asin, sqrt
 from streamlit_js_eval import get_geolocation
 from dotenv import load_dotenv
 from wordcloud import WordCloud
+from Function.fulltext import search_condition  # 지점명/주소 FULLTEXT(ngram) 검색 조건
+from Function.db import get_conn as pooled_conn, get_data_version  # 공용 MySQL 커넥션 풀 / 데이터 버전
+from Function.swr import SWRCache  # 스냅샷 stale-while-revalidate 캐시
+from Function.singleflight import single_flight  # 같은 조회 동시 요청은 DB에 한 번만
+from Function.snapshot import Snapshot  # 전 지점 컬럼 스냅샷(마스크 필터)
+from Function.query_key import make_query_key, QUERY_STATS  # 검색 조건 정규화(캐시 키) + 적중률 집계
+from Function.flags import FILTER_OPTIONS, FILTER_OPTION_ITEMS, labels_for_mask, mask_from_row, mask_condition  # 서비스 플래그 레지스트리
 
 # ✅ 폰트 경로 (프로젝트 루트 기준: ./fonts/Pretendard-Regular.otf)
 FONT_PATH = os.path.join(os.getcwd(), "fonts", "Pretendard-Regular.otf")
@@ -139,14 +147,9 @@ st.markdown("""
 # -----------------------------------------------------------------------------
 # 2) Constants / Session
 # -----------------------------------------------------------------------------
-FILTER_OPTIONS = {
-    "is_ev": "⚡ 전기차 전담",
-    "is_hydrogen": "💧 수소차 전담",
-    "is_frame": "🔨 판금/차체 수리",
-    "is_cs_excellent": "🏆 우수 협력점",
-    "is_n_line": "🏎️ N-Line 전담",
-}
-FLAG_COLS_SQL = ", ".join(FILTER_OPTIONS.keys())
+# FILTER_OPTIONS(컬럼 -> 화면 라벨)는 Function/flags.py 레지스트리에서 가져온다.
+# service_mask: 플래그 비트마스크 (필터/뱃지 렌더링용)
+FLAG_COLS_SQL = ", ".join(FILTER_OPTIONS.keys()) + ", service_mask"
 
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
@@ -169,7 +172,12 @@ if "last_click_key" not in st.session_state:
 # 3) Helpers
 # -----------------------------------------------------------------------------
 def get_conn():
-    return mysql.connector.connect(**DB_CONFIG)
+    # 공용 커넥션 풀에서 빌림 (conn.close() 하면 풀로 반납)
+    return pooled_conn(DB_CONFIG)
+
+def current_data_version():
+    # 현재 데이터 버전(meta.data_version). 캐시 로더가 캐시 키로 쓴다.
+    return get_data_version(DB_CONFIG)
 
 def scroll_down():
     js = """<script>setTimeout(function(){window.parent.scrollTo({top: 500, behavior:'smooth'});}, 300);</script>"""
@@ -186,13 +194,18 @@ def haversine(lon1, lat1, lon2, lat2):
     c = 2 * asin(sqrt(a))
     return c * R
 
-def format_services_html(row):
-    badges = ""
-    for col, label in FILTER_OPTIONS.items():
-        if row.get(col) == 1:
-            badges += f'<span style="background:#f0f7ff; color:#0054a6; padding:3px 6px; border-radius:4px; font-size:11px; margin-right:4px; border:1px solid #cce4ff; font-weight:600;">{label}</span>'
+# 뱃지 HTML은 service_mask 값(최대 2^10가지)별로 한 번만 만들고 재사용
+@lru_cache(maxsize=None)
+def _popup_badges_html(mask: int) -> str:
+    badges = "".join(
+        f'<span style="background:#f0f7ff; color:#0054a6; padding:3px 6px; border-radius:4px; font-size:11px; margin-right:4px; border:1px solid #cce4ff; font-weight:600;">{label}</span>'
+        for label in labels_for_mask(mask, FILTER_OPTION_ITEMS)
+    )
     return f'<div style="margin-top:8px; line-height:1.6;">{badges}</div>' if badges else ""
 
+def format_services_html(row):
+    return _popup_badges_html(mask_from_row(row))
+
 def add_markers_to_map(m, rows, user_lat=None, user_lng=None):
     fg = folium.FeatureGroup(name="검색 결과")
     for row in rows:
@@ -302,44 +315,57 @@ def render_top5_wordcloud_and_list(ph, show_wc: bool = True):
 # -----------------------------------------------------------------------------
 # 4) DB Queries
 # -----------------------------------------------------------------------------
-@st.cache_data(ttl=3600)
-def get_regions():
+@st.cache_data(max_entries=2)
+def _fetch_regions(data_version):
+    # data_version: 캐시 키 (재적재로 버전이 바뀔 때만 다시 읽는다). 실패는 캐시되지 않도록 예외를 올린다.
     conn = None
     try:
         conn = get_conn()
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM bluehands_db.regions ORDER BY id")
         return [row[0] for row in cursor.fetchall()]
-    except:
-        return []
     finally:
         if conn:
             conn.close()
 
-@st.cache_data(ttl=600)
-def get_bluehands_data(search_text, selected_filters, region_filter):
+def get_regions():
+    try:
+        return _fetch_regions(current_data_version())
+    except:
+        return []
+
+@st.cache_data(max_entries=256)
+def _fetch_bluehands_data(query_key, data_version):
+    # query_key: 정규화된 검색 조건(QueryKey), data_version: 캐시 키 (재적재로 버전이 바뀔 때만 다시 읽는다).
+    # 실패는 캐시되지 않도록 예외를 올린다.
+    QUERY_STATS.miss("bluehands")
+    search_text, selected_filters, region_filter = query_key
     conn = None
     try:
         conn = get_conn()
         cursor = conn.cursor(dictionary=True)
 
+        # 검색어는 FULLTEXT(ngram) 인덱스로 찾고, MATCH 점수(relevance) 높은 순으로 정렬
+        search_sql, search_params, score_sql, score_params = search_condition(search_text)
         query = f"""
-            SELECT a.id, a.name, a.latitude, a.longitude, a.address, a.phone, {FLAG_COLS_SQL}
+            SELECT a.id, a.name, a.latitude, a.longitude, a.address, a.phone, {FLAG_COLS_SQL},
+                   {score_sql} AS relevance
             FROM bluehands a
             LEFT JOIN regions b ON a.region_id = b.id
         """
 
         conditions = []
-        params = []
+        params = list(score_params)
 
-        if search_text:
-            conditions.append("(a.name LIKE %s OR a.address LIKE %s)")
-            ptn = f"%{search_text}%"
-            params.extend([ptn, ptn])
+        if search_sql:
+            conditions.append(search_sql)
+            params.extend(search_params)
 
-        if selected_filters:
-            for col in selected_filters:
-                conditions.append(f"a.{col} = 1")
+        # 서비스 옵션(AND)은 비트마스크 조건 하나로: (a.service_mask & m) = m
+        mask_sql, mask_params = mask_condition(selected_filters)
+        if mask_sql:
+            conditions.append(mask_sql)
+            params.extend(mask_params)
 
         if region_filter and region_filter != "(전체)":
             conditions.append("b.name = %s")
@@ -347,29 +373,83 @@ def get_bluehands_data(search_text, selected_filters, region_filter):
 
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        if search_sql:
+            query += " ORDER BY relevance DESC"
 
         cursor.execute(query, params)
         return cursor.fetchall()
+    finally:
+        if conn:
+            conn.close()
+
+def get_bluehands_data(query_key):
+    QUERY_STATS.request("bluehands")
+    try:
+        return _fetch_bluehands_data(query_key, current_data_version())
     except mysql.connector.Error as err:
         st.error(f"❌ SQL 에러: {err}")
         return []
     except Exception as e:
         st.error(f"❌ 기타 에러: {e}")
         return []
+
+# SWRCache에는 동시 계산 잠금이 없어서(첫 요청 / max_staleness 초과 시 각 세션이 직접 만듦)
+# 같은 버전 스냅샷을 동시에 여러 번 만들지 않도록 single-flight로 묶는다.
+# (st.cache_data 로더는 키별 계산 잠금이 이미 있어서 single-flight를 붙이지 않는다)
+@single_flight
+def build_snapshot(data_version):
+    # 전 지점을 한 번 읽어 컬럼 스냅샷으로 (캐시는 get_snapshot()의 SWRCache, 실패는 예외를 올림)
+    conn = None
+    try:
+        conn = get_conn()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            f"SELECT a.id, a.type_id, a.name, a.latitude, a.longitude, a.address, a.phone, {FLAG_COLS_SQL}, "
+            f"b.name AS region_name "
+            f"FROM bluehands a LEFT JOIN regions b ON a.region_id = b.id ORDER BY a.id"
+        )
+        return Snapshot.from_rows(cursor.fetchall(), version=data_version)
     finally:
         if conn:
             conn.close()
 
+@st.cache_resource
+def get_snapshot_cache():
+    # 스냅샷 캐시 (프로세스당 1개, 세션끼리 공유)
+    #  - data_version이 바뀌면 기존 스냅샷을 바로 주고 새 스냅샷은 백그라운드에서 만든다.
+    #  - SWR_MAX_STALENESS초가 지나도록 못 만들었으면 그때는 기다려서 만든다.
+    return SWRCache()
+
+def get_snapshot():
+    return get_snapshot_cache().get("snapshot", current_data_version(), build_snapshot)
+
+def search_bluehands(search_text, selected_filters, region_filter):
+    # 스냅샷 마스크 연산으로 바로 답하고, 스냅샷이 없으면(DB 장애 등) SQL 조회로 대체
+    # 검색 진입점: 원래/정규화 키와 요청 수를 여기서 집계하고, 스냅샷으로 답했으면 hit / SQL로 갔으면 miss
+    query_key = QUERY_STATS.track("search", search_text, selected_filters, region_filter)
+    try:
+        snap = get_snapshot()
+    except Exception:
+        snap = None
+    if snap is None or not len(snap):
+        QUERY_STATS.miss("search")
+        return get_bluehands_data(query_key)
+    QUERY_STATS.hit("search")
+    return snap.query(*query_key)
+
 # -----------------------------------------------------------------------------
 # 5) Table + Pagination (원본 그대로)
 # -----------------------------------------------------------------------------
-def _service_text_from_row(row: dict) -> str:
-    labels = [label for col, label in FILTER_OPTIONS.items() if row.get(col) == 1]
+@lru_cache(maxsize=None)
+def _service_badges_html(mask: int) -> str:
     return "".join([
         f'<span class="badge" style="display:inline-block; background:#eff6ff; color:#1e40af; padding:2px 8px; border-radius:9999px; font-size:11px; font-weight:600; margin:2px; border:1px solid #dbeafe;">{l}</span>'
-        for l in labels
+        for l in labels_for_mask(mask, FILTER_OPTION_ITEMS)
     ])
 
+def _service_text_from_row(row: dict) -> str:
+    return _service_badges_html(mask_from_row(row))
+
 def render_hy_table_page(rows_page: list[dict]):
     css = """
     <style>
@@ -557,10 +637,12 @@ with st.sidebar:
     top5_placeholder = st.empty()
     render_top5_wordcloud_and_list(top5_placeholder, show_wc=show_wordcloud)
 
-should_search = search_query or selected_service_cols or (selected_region != "(전체)")
+# 검색 조건은 정규화한 QueryKey 하나로 (공백/대소문자/옵션 순서가 달라도 같은 조회 = 같은 캐시 항목)
+query_key = make_query_key(search_query, selected_service_cols, selected_region)
+should_search = not query_key.is_empty
 
 if should_search:
-    data_list = get_bluehands_data(search_query, selected_service_cols, selected_region)
+    data_list = search_bluehands(search_query, selected_service_cols, selected_region)
 
     if not data_list:
         st.error("조건에 맞는 검색 결과가 없습니다.")